@@ -0,0 +1,116 @@
+"""
+Caché de páginas de GET /users
+==============================
+
+Guarda el cuerpo JSON ya codificado de cada página. La clave incluye la
+época del almacén (que cambia si se reinicia) y la versión de la colección,
+que cambia con cada escritura: una entrada nunca puede servir datos viejos,
+aunque la escritura la haya hecho otro worker.
+
+Las escrituras hechas por este worker además llaman a ``invalidar()``. Como
+toda escritura cambia la versión (y el ``total`` de cada página), ninguna
+entrada anterior vuelve a ser alcanzable, así que vaciar la caché libera
+exactamente la memoria que ya no sirve.
+
+Todas las operaciones corren en el event loop del worker (un solo hilo),
+por lo que no se usan locks.
+"""
+
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+
+CAPACIDAD_POR_DEFECTO = 256
+MAX_BYTES_POR_DEFECTO = 8 * 1024 * 1024
+
+
+class CachePaginas:
+    """LRU de cuerpos codificados, acotada por cantidad de entradas y por bytes"""
+
+    def __init__(self, capacidad: int = CAPACIDAD_POR_DEFECTO, max_bytes: int = MAX_BYTES_POR_DEFECTO):
+        self.capacidad = capacidad
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self._entradas: "OrderedDict[Hashable, bytes]" = OrderedDict()
+
+    @property
+    def activa(self) -> bool:
+        return self.capacidad > 0
+
+    def obtener(self, clave: Hashable) -> Optional[bytes]:
+        cuerpo = self._entradas.get(clave)
+        if cuerpo is None:
+            self.fallos += 1
+            return None
+        self._entradas.move_to_end(clave)
+        self.aciertos += 1
+        return cuerpo
+
+    def guardar(self, clave: Hashable, cuerpo: bytes):
+        if not self.activa or len(cuerpo) > self.max_bytes:
+            return
+        anterior = self._entradas.pop(clave, None)
+        if anterior is not None:
+            self.bytes -= len(anterior)
+        self._entradas[clave] = cuerpo
+        self.bytes += len(cuerpo)
+        while len(self._entradas) > self.capacidad or self.bytes > self.max_bytes:
+            _, expulsado = self._entradas.popitem(last=False)
+            self.bytes -= len(expulsado)
+
+    def invalidar(self):
+        if self._entradas:
+            self.invalidaciones += 1
+            self._entradas.clear()
+            self.bytes = 0
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entradas),
+            "capacity": self.capacidad,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.aciertos,
+            "misses": self.fallos,
+            "hit_ratio": _proporcion_aciertos(self.aciertos, self.fallos),
+            "invalidations": self.invalidaciones,
+        }
+
+    def como_prometheus(self, pid: Optional[int] = None) -> str:
+        return estadisticas_como_prometheus(self.estadisticas(), pid)
+
+
+def _proporcion_aciertos(aciertos: int, fallos: int) -> float:
+    consultas = aciertos + fallos
+    return round(aciertos / consultas, 4) if consultas else 0.0
+
+
+def sumar_estadisticas(estadisticas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Estadísticas de las cachés de varios workers, como si fueran una sola"""
+    total = {clave: sum(e[clave] for e in estadisticas) for clave in
+             ("entries", "capacity", "bytes", "max_bytes", "hits", "misses", "invalidations")}
+    total["hit_ratio"] = _proporcion_aciertos(total["hits"], total["misses"])
+    return total
+
+
+def estadisticas_como_prometheus(estadisticas: Dict[str, Any], pid: Optional[int] = None) -> str:
+    """Líneas en formato Prometheus para /sistema/metrics (sin ``pid`` si son de todos los workers)"""
+    etiqueta = f'{{pid="{pid}"}}' if pid is not None else ""
+    lineas = []
+    for nombre, clave, tipo, ayuda in (
+        ("mock_api_users_page_cache_hits_total", "hits", "counter", "Páginas servidas desde la caché."),
+        ("mock_api_users_page_cache_misses_total", "misses", "counter", "Páginas que hubo que generar."),
+        ("mock_api_users_page_cache_entries", "entries", "gauge", "Páginas guardadas en la caché."),
+        ("mock_api_users_page_cache_bytes", "bytes", "gauge", "Bytes ocupados por las páginas en caché."),
+    ):
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}", f"{nombre}{etiqueta} {estadisticas[clave]}"]
+    return "\n".join(lineas) + "\n"
+
+
+def crear_cache_paginas() -> CachePaginas:
+    """Caché configurada por MOCK_API_CACHE_PAGINAS (entradas; 0 la desactiva)"""
+    return CachePaginas(int(os.environ.get("MOCK_API_CACHE_PAGINAS", CAPACIDAD_POR_DEFECTO)))
@@ -0,0 +1,142 @@
+"""
+Feed de cambios de usuarios (Server-Sent Events)
+================================================
+
+Cada escritura publica un evento con un número de secuencia creciente. El
+ID del evento es ``<epoca>-<seq>``: la época es aleatoria por proceso, así
+que un ID de otra ejecución del servidor (o de otro worker) nunca se
+confunde con uno propio aunque la secuencia coincida. El
+evento se codifica una sola vez, ya en formato SSE, y todos los suscriptores
+envían el mismo objeto ``bytes``: no hay copias por suscriptor.
+
+Los últimos eventos se guardan en un buffer circular acotado para que un
+cliente que se reconecta con ``Last-Event-ID`` reciba lo que se perdió. Si
+ese ID ya salió del buffer (o es de otra época), el cliente
+recibe un evento ``reset`` y debe volver a leer GET /users.
+
+El feed vive en el proceso: con varios workers cada uno publica solo las
+escrituras que atendió él.
+"""
+
+import asyncio
+import json
+import secrets
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Optional, Tuple
+
+
+CAPACIDAD_POR_DEFECTO = 1024
+
+# Comentario SSE enviado cuando no hay eventos, para que proxies y clientes
+# no cierren la conexión por inactividad
+LATIDO = b": ping\n\n"
+INTERVALO_LATIDO = 15.0
+
+
+def evento_sse(id_evento: Optional[str], tipo: str, datos: Any) -> bytes:
+    """Codifica un evento SSE (``id_evento`` None omite el campo id)"""
+    id_evento = f"id: {id_evento}\n" if id_evento is not None else ""
+    return f"{id_evento}event: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class FeedCambios:
+    """Buffer circular de eventos ya codificados con notificación a suscriptores"""
+
+    def __init__(self, capacidad: int = CAPACIDAD_POR_DEFECTO):
+        self.epoca = f"{secrets.randbits(32):08x}"
+        self.seq = 0
+        self.suscriptores = 0
+        self._eventos: Deque[Tuple[int, bytes]] = deque(maxlen=capacidad)
+        self._nuevo_evento: Optional[asyncio.Event] = None
+
+    def publicar(self, tipo: str, datos: Any) -> int:
+        """Agrega un evento y despierta a todos los suscriptores"""
+        self.seq += 1
+        self._eventos.append((self.seq, evento_sse(self.id_evento(self.seq), tipo, datos)))
+        if self._nuevo_evento is not None:
+            # Un Event nuevo por publicación: los que esperaban el anterior
+            # despiertan una vez y buscan sus eventos en el buffer
+            self._nuevo_evento.set()
+            self._nuevo_evento = None
+        return self.seq
+
+    def id_evento(self, seq: int) -> str:
+        return f"{self.epoca}-{seq}"
+
+    def seq_desde_id(self, id_evento: Optional[str]) -> Optional[int]:
+        """
+        Secuencia de un Last-Event-ID (None si no se envió). Un ID inválido
+        o de otra época retorna -1, que provoca un ``reset``.
+        """
+        if id_evento is None:
+            return None
+        epoca, _, seq = id_evento.strip().rpartition("-")
+        if epoca != self.epoca or not seq.isdigit():
+            return -1
+        return int(seq)
+
+    def _reset(self) -> bytes:
+        return evento_sse(self.id_evento(self.seq), "reset", {"seq": self.seq})
+
+    def pendientes(self, ultimo: int) -> Optional[list]:
+        """
+        Eventos con secuencia mayor a ``ultimo``.
+
+        Retorna None si no se puede continuar desde ``ultimo``: los eventos
+        siguientes ya salieron del buffer o el ID no existe en este feed.
+        """
+        if ultimo > self.seq:
+            return None
+        if ultimo == self.seq:
+            return []
+        primero = self._eventos[0][0] if self._eventos else self.seq + 1
+        if ultimo < primero - 1:
+            return None
+        # Las secuencias del buffer son consecutivas
+        inicio = ultimo - primero + 1
+        return [self._eventos[i][1] for i in range(inicio, len(self._eventos))]
+
+    async def esperar(self, timeout: float):
+        """Espera la siguiente publicación o hasta ``timeout`` segundos"""
+        if self._nuevo_evento is None:
+            self._nuevo_evento = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._nuevo_evento.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def suscribir(self, ultimo: Optional[int] = None,
+                        intervalo_latido: float = INTERVALO_LATIDO) -> AsyncIterator[bytes]:
+        """
+        Flujo SSE para un suscriptor.
+
+        ``ultimo`` es la secuencia del Last-Event-ID del cliente (ver
+        ``seq_desde_id``); sin él solo se envían los eventos publicados desde
+        la suscripción.
+        """
+        self.suscriptores += 1
+        try:
+            if ultimo is None:
+                ultimo = self.seq
+            elif self.pendientes(ultimo) is None:
+                yield self._reset()
+                ultimo = self.seq
+
+            while True:
+                eventos = self.pendientes(ultimo)
+                if eventos is None:
+                    # El suscriptor quedó tan atrás que el buffer ya rotó
+                    yield self._reset()
+                    ultimo = self.seq
+                    continue
+                if eventos:
+                    for evento in eventos:
+                        yield evento
+                    ultimo += len(eventos)
+                    continue
+                seq_antes = self.seq
+                await self.esperar(intervalo_latido)
+                if self.seq == seq_antes:
+                    yield LATIDO
+        finally:
+            self.suscriptores -= 1
@@ -0,0 +1,478 @@
+"""
+Repositorios para el almacén de usuarios
+========================================
+
+El almacén por defecto es una lista en memoria, igual que antes. Cuando el
+servidor corre con varios workers cada proceso tendría su propia lista y los
+datos divergirían, por lo que existe una alternativa en SQLite que comparten
+todos los workers de la misma máquina.
+
+Todos los repositorios llevan contadores de versión (por usuario y de la
+colección completa) que incrementan con cada escritura, más una ``epoca``
+aleatoria por almacén: juntos permiten generar ETags que nunca se repiten
+para contenidos distintos, ni siquiera entre reinicios del servidor.
+
+Selección del almacén (variable de entorno MOCK_API_ALMACEN):
+    memoria                     Lista en memoria del proceso (por defecto)
+    sqlite:///ruta/usuarios.db  Archivo SQLite compartido entre procesos
+    sqlite:///ruta/usuarios.db?particiones=4
+                                Usuarios repartidos en 4 archivos SQLite
+                                (usuarios.0.db ... usuarios.3.db) para que
+                                las escrituras no compitan por un solo lock
+"""
+
+import heapq
+import itertools
+import os
+import secrets
+import sqlite3
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+
+
+# Datos de ejemplo con los que arranca cualquier almacén
+USUARIOS_INICIALES = [
+    {"id": 1, "name": "Juan Pérez", "email": "juan@example.com"},
+    {"id": 2, "name": "María García", "email": "maria@example.com"},
+    {"id": 3, "name": "Carlos López", "email": "carlos@example.com"}
+]
+
+ALMACEN_POR_DEFECTO = "memoria"
+
+
+class VersionNoCoincide(Exception):
+    """La versión actual del usuario no está entre las versiones esperadas"""
+
+    def __init__(self, version_actual: int):
+        super().__init__(f"Versión actual: {version_actual}")
+        self.version_actual = version_actual
+
+
+class RepositorioUsuariosMemoria:
+    """Usuarios guardados en una lista del proceso actual"""
+
+    # Las operaciones no esperan disco ni locks: se llaman desde el event loop
+    BLOQUEANTE = False
+
+    def __init__(self, usuarios: Optional[List[Dict[str, Any]]] = None):
+        self.usuarios = [dict(u) for u in (USUARIOS_INICIALES if usuarios is None else usuarios)]
+        self.epoca = f"{secrets.randbits(32):08x}"
+        # Nunca se borran: un ID reutilizado tras eliminar sigue subiendo de versión
+        self._versiones: Dict[int, int] = {}
+        self._version_coleccion = 0
+
+    def _nueva_version(self, user_id: int):
+        self._versiones[user_id] = self._versiones.get(user_id, 0) + 1
+        self._version_coleccion += 1
+
+    def version_usuario(self, user_id: int) -> int:
+        return self._versiones.get(user_id, 0)
+
+    def version_coleccion(self) -> int:
+        return self._version_coleccion
+
+    def pagina(self, inicio: int, fin: int) -> Tuple[List[Dict[str, Any]], int, int]:
+        """(usuarios[inicio:fin], total, versión de la colección) de un mismo instante"""
+        return self.listar(inicio, fin), self.total(), self._version_coleccion
+
+    def obtener_con_version(self, user_id: int) -> Tuple[Optional[Dict[str, Any]], int]:
+        return self.obtener(user_id), self.version_usuario(user_id)
+
+    def listar(self, inicio: int, fin: int) -> List[Dict[str, Any]]:
+        return self.usuarios[inicio:fin]
+
+    def total(self) -> int:
+        return len(self.usuarios)
+
+    def obtener(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return next((u for u in self.usuarios if u["id"] == user_id), None)
+
+    def crear(self, name: str, email: str) -> Dict[str, Any]:
+        nuevo = {"id": len(self.usuarios) + 1, "name": name, "email": email}
+        self.usuarios.append(nuevo)
+        self._nueva_version(nuevo["id"])
+        return nuevo
+
+    def _verificar_version(self, user_id: int, versiones: Optional[Set[int]]):
+        if versiones is not None and self.version_usuario(user_id) not in versiones:
+            raise VersionNoCoincide(self.version_usuario(user_id))
+
+    def actualizar(self, user_id: int, cambios: Dict[str, Any],
+                   versiones: Optional[Set[int]] = None) -> Tuple[Optional[Dict[str, Any]], int]:
+        """
+        Aplica ``cambios`` y retorna (usuario, nueva versión). Si se indican
+        ``versiones``, solo escribe si la versión actual es una de ellas.
+        """
+        usuario = self.obtener(user_id)
+        if usuario is None:
+            return None, self.version_usuario(user_id)
+        self._verificar_version(user_id, versiones)
+        usuario.update(cambios)
+        self._nueva_version(user_id)
+        return usuario, self.version_usuario(user_id)
+
+    def eliminar(self, user_id: int, versiones: Optional[Set[int]] = None) -> bool:
+        if self.obtener(user_id) is None:
+            return False
+        self._verificar_version(user_id, versiones)
+        self.usuarios = [u for u in self.usuarios if u["id"] != user_id]
+        self._nueva_version(user_id)
+        return True
+
+    def disponible(self) -> bool:
+        return isinstance(self.usuarios, list)
+
+
+class RepositorioUsuariosSQLite:
+    """
+    Usuarios guardados en un archivo SQLite compartido entre workers.
+
+    Replica la semántica de la lista en memoria: el orden es el de inserción
+    (columna ``seq``) y el ID de un usuario nuevo es ``total + 1``. Las
+    escrituras usan ``BEGIN IMMEDIATE`` para que el cálculo del ID y la
+    inserción sean atómicos aunque varios procesos escriban a la vez.
+    """
+
+    # Las operaciones esperan al disco y al lock de otros workers: los
+    # endpoints las ejecutan en el threadpool
+    BLOQUEANTE = True
+
+    def __init__(self, ruta: str, usuarios_iniciales: Optional[List[Dict[str, Any]]] = None):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conexion.row_factory = sqlite3.Row
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._inicializar(USUARIOS_INICIALES if usuarios_iniciales is None else usuarios_iniciales)
+
+    def _inicializar(self, usuarios_iniciales: List[Dict[str, Any]]):
+        with self._transaccion() as cursor:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS usuarios ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " id INTEGER NOT NULL,"
+                " name TEXT NOT NULL,"
+                " email TEXT NOT NULL)"
+            )
+            cursor.execute("CREATE INDEX IF NOT EXISTS usuarios_id ON usuarios (id)")
+            cursor.execute("CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+            cursor.execute("CREATE TABLE IF NOT EXISTS versiones (id INTEGER PRIMARY KEY, version INTEGER NOT NULL)")
+            # Solo el primer worker en llegar carga los datos de ejemplo
+            if cursor.execute("SELECT 1 FROM meta WHERE clave = 'inicializado'").fetchone() is None:
+                cursor.executemany(
+                    "INSERT INTO usuarios (id, name, email) VALUES (:id, :name, :email)",
+                    usuarios_iniciales
+                )
+                cursor.execute("INSERT INTO meta (clave, valor) VALUES ('inicializado', 1)")
+            cursor.executemany(
+                "INSERT OR IGNORE INTO meta (clave, valor) VALUES (?, ?)",
+                [("epoca", secrets.randbits(32)), ("version_coleccion", 0)]
+            )
+            epoca = cursor.execute("SELECT valor FROM meta WHERE clave = 'epoca'").fetchone()[0]
+        self.epoca = f"{epoca:08x}"
+
+    @staticmethod
+    def _nueva_version(cursor: sqlite3.Cursor, user_id: int):
+        cursor.execute(
+            "INSERT INTO versiones (id, version) VALUES (?, 1) "
+            "ON CONFLICT (id) DO UPDATE SET version = version + 1",
+            (user_id,)
+        )
+        cursor.execute("UPDATE meta SET valor = valor + 1 WHERE clave = 'version_coleccion'")
+
+    def version_usuario(self, user_id: int) -> int:
+        with self._transaccion(escritura=False) as cursor:
+            return self._version(cursor, user_id)
+
+    def version_coleccion(self) -> int:
+        return self._consultar("SELECT valor FROM meta WHERE clave = 'version_coleccion'")[0][0]
+
+    def pagina(self, inicio: int, fin: int) -> Tuple[List[Dict[str, Any]], int, int]:
+        """(usuarios[inicio:fin], total, versión de la colección) de un mismo instante"""
+        with self._transaccion(escritura=False) as cursor:
+            usuarios = self._listar(cursor, inicio, fin)
+            total = cursor.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0]
+            version = cursor.execute("SELECT valor FROM meta WHERE clave = 'version_coleccion'").fetchone()[0]
+        return usuarios, total, version
+
+    def obtener_con_version(self, user_id: int) -> Tuple[Optional[Dict[str, Any]], int]:
+        filas = self._consultar(
+            "SELECT u.id, u.name, u.email, COALESCE(v.version, 0) AS version"
+            " FROM usuarios u LEFT JOIN versiones v ON v.id = u.id"
+            " WHERE u.id = ? ORDER BY u.seq LIMIT 1",
+            (user_id,)
+        )
+        if not filas:
+            return None, self.version_usuario(user_id)
+        usuario = dict(filas[0])
+        return usuario, usuario.pop("version")
+
+    def _transaccion(self, escritura: bool = True):
+        return _Transaccion(self._conexion, self._lock, "BEGIN IMMEDIATE" if escritura else "BEGIN")
+
+    def _consultar(self, sql: str, parametros=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conexion.execute(sql, parametros).fetchall()
+
+    # Columna que define el orden de los listados
+    ORDEN = "seq"
+
+    @classmethod
+    def _listar(cls, cursor: sqlite3.Cursor, inicio: int, fin: int) -> List[Dict[str, Any]]:
+        if 0 <= inicio <= fin:
+            filas = cursor.execute(
+                f"SELECT id, name, email FROM usuarios ORDER BY {cls.ORDEN} LIMIT ? OFFSET ?",
+                (fin - inicio, inicio)
+            ).fetchall()
+            return [dict(fila) for fila in filas]
+        # Índices negativos o invertidos: se respeta la semántica de slicing de Python
+        filas = cursor.execute(f"SELECT id, name, email FROM usuarios ORDER BY {cls.ORDEN}").fetchall()
+        return [dict(fila) for fila in filas][inicio:fin]
+
+    def listar(self, inicio: int, fin: int) -> List[Dict[str, Any]]:
+        with self._transaccion(escritura=False) as cursor:
+            return self._listar(cursor, inicio, fin)
+
+    def total(self) -> int:
+        return self._consultar("SELECT COUNT(*) FROM usuarios")[0][0]
+
+    def obtener(self, user_id: int) -> Optional[Dict[str, Any]]:
+        filas = self._consultar(
+            "SELECT id, name, email FROM usuarios WHERE id = ? ORDER BY seq LIMIT 1",
+            (user_id,)
+        )
+        return dict(filas[0]) if filas else None
+
+    def crear(self, name: str, email: str) -> Dict[str, Any]:
+        with self._transaccion() as cursor:
+            nuevo_id = cursor.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] + 1
+            cursor.execute("INSERT INTO usuarios (id, name, email) VALUES (?, ?, ?)", (nuevo_id, name, email))
+            self._nueva_version(cursor, nuevo_id)
+        return {"id": nuevo_id, "name": name, "email": email}
+
+    @staticmethod
+    def _version(cursor: sqlite3.Cursor, user_id: int) -> int:
+        fila = cursor.execute("SELECT version FROM versiones WHERE id = ?", (user_id,)).fetchone()
+        return fila[0] if fila else 0
+
+    def _verificar_version(self, cursor: sqlite3.Cursor, user_id: int, versiones: Optional[Set[int]]):
+        if versiones is not None:
+            version_actual = self._version(cursor, user_id)
+            if version_actual not in versiones:
+                raise VersionNoCoincide(version_actual)
+
+    def actualizar(self, user_id: int, cambios: Dict[str, Any],
+                   versiones: Optional[Set[int]] = None) -> Tuple[Optional[Dict[str, Any]], int]:
+        with self._transaccion() as cursor:
+            fila = cursor.execute(
+                "SELECT seq, id, name, email FROM usuarios WHERE id = ? ORDER BY seq LIMIT 1",
+                (user_id,)
+            ).fetchone()
+            if fila is None:
+                return None, self._version(cursor, user_id)
+            # Verificación y escritura en la misma transacción: sin carreras entre workers
+            self._verificar_version(cursor, user_id, versiones)
+            usuario = {"id": fila["id"], "name": fila["name"], "email": fila["email"]}
+            usuario.update(cambios)
+            cursor.execute(
+                "UPDATE usuarios SET name = ?, email = ? WHERE seq = ?",
+                (usuario["name"], usuario["email"], fila["seq"])
+            )
+            self._nueva_version(cursor, user_id)
+            version = self._version(cursor, user_id)
+        return usuario, version
+
+    def eliminar(self, user_id: int, versiones: Optional[Set[int]] = None) -> bool:
+        with self._transaccion() as cursor:
+            if cursor.execute("SELECT 1 FROM usuarios WHERE id = ? LIMIT 1", (user_id,)).fetchone() is None:
+                return False
+            self._verificar_version(cursor, user_id, versiones)
+            cursor.execute("DELETE FROM usuarios WHERE id = ?", (user_id,))
+            self._nueva_version(cursor, user_id)
+        return True
+
+    def disponible(self) -> bool:
+        try:
+            self._consultar("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+
+class _ParticionUsuarios(RepositorioUsuariosSQLite):
+    """
+    Una partición de RepositorioUsuariosParticionado. Los IDs los asigna el
+    coordinador y pueden llegar desordenados entre workers, así que el
+    orden de los listados es por ID.
+    """
+
+    ORDEN = "id"
+
+    def insertar(self, usuario: Dict[str, Any]):
+        """Agrega un usuario con un ID ya asignado"""
+        with self._transaccion() as cursor:
+            cursor.execute("INSERT INTO usuarios (id, name, email) VALUES (:id, :name, :email)", usuario)
+            self._nueva_version(cursor, usuario["id"])
+
+
+class RepositorioUsuariosParticionado:
+    """
+    Usuarios repartidos en N archivos SQLite (particiones) según ``id % N``.
+
+    Con un solo archivo, las escrituras de todos los workers compiten por el
+    único lock de escritura de SQLite. Aquí cada partición tiene el suyo, así
+    que las escrituras sobre usuarios de particiones distintas avanzan en
+    paralelo.
+
+    - Obtener, actualizar y eliminar van solo a la partición dueña del ID.
+    - Los IDs nuevos salen de un contador en el archivo coordinador
+      (``ruta``), que también guarda la época. Son crecientes, por lo que el
+      orden por ID es el orden de inserción; a diferencia de los otros
+      almacenes, un ID eliminado no se reutiliza.
+    - Una página consulta todas las particiones y mezcla sus filas por ID;
+      para la página que termina en la fila ``fin`` cada partición lee hasta
+      ``fin`` filas, así que las páginas profundas cuestan más (la caché de
+      páginas de GET /users absorbe la mayoría). Cada partición se lee en su
+      propia transacción: con escrituras concurrentes la página no es una
+      instantánea atómica del conjunto.
+    - La versión de la colección es la suma de las versiones de las
+      particiones: cada escritura incrementa exactamente una de ellas.
+    """
+
+    BLOQUEANTE = True
+
+    def __init__(self, ruta: str, particiones: int, usuarios_iniciales: Optional[List[Dict[str, Any]]] = None):
+        if particiones < 1:
+            raise ValueError("Se necesita al menos una partición")
+        iniciales = USUARIOS_INICIALES if usuarios_iniciales is None else usuarios_iniciales
+        base, extension = os.path.splitext(ruta)
+        self.particiones = [
+            _ParticionUsuarios(
+                f"{base}.{numero}{extension or '.db'}",
+                [u for u in iniciales if u["id"] % particiones == numero]
+            )
+            for numero in range(particiones)
+        ]
+
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        with self._transaccion() as cursor:
+            cursor.execute("CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor INTEGER NOT NULL)")
+            cursor.executemany(
+                "INSERT OR IGNORE INTO meta (clave, valor) VALUES (?, ?)",
+                [
+                    ("epoca", secrets.randbits(32)),
+                    ("ultimo_id", max((u["id"] for u in iniciales), default=0)),
+                    ("particiones", particiones),
+                ]
+            )
+            meta = dict(cursor.execute("SELECT clave, valor FROM meta").fetchall())
+        if meta["particiones"] != particiones:
+            # Cambiar N movería usuarios de partición: no se soporta sin migrar
+            raise ValueError(f"El almacén {ruta} se creó con {meta['particiones']} particiones, no {particiones}")
+        self.epoca = f"{meta['epoca']:08x}"
+
+    def _transaccion(self):
+        return _Transaccion(self._conexion, self._lock, "BEGIN IMMEDIATE")
+
+    def _particion(self, user_id: int) -> _ParticionUsuarios:
+        return self.particiones[user_id % len(self.particiones)]
+
+    def version_usuario(self, user_id: int) -> int:
+        return self._particion(user_id).version_usuario(user_id)
+
+    def version_coleccion(self) -> int:
+        return sum(particion.version_coleccion() for particion in self.particiones)
+
+    def pagina(self, inicio: int, fin: int) -> Tuple[List[Dict[str, Any]], int, int]:
+        """(usuarios[inicio:fin], total, versión de la colección) mezclando todas las particiones"""
+        # Cada partición aporta a lo sumo sus primeras ``fin`` filas
+        limite = fin if 0 <= inicio <= fin else sys.maxsize
+        resultados = [particion.pagina(0, limite) for particion in self.particiones]
+        usuarios = heapq.merge(*(filas for filas, _, _ in resultados), key=lambda u: u["id"])
+        total = sum(cantidad for _, cantidad, _ in resultados)
+        version = sum(version for _, _, version in resultados)
+        if 0 <= inicio <= fin:
+            return list(itertools.islice(usuarios, inicio, fin)), total, version
+        return list(usuarios)[inicio:fin], total, version
+
+    def obtener_con_version(self, user_id: int) -> Tuple[Optional[Dict[str, Any]], int]:
+        return self._particion(user_id).obtener_con_version(user_id)
+
+    def listar(self, inicio: int, fin: int) -> List[Dict[str, Any]]:
+        return self.pagina(inicio, fin)[0]
+
+    def total(self) -> int:
+        return sum(particion.total() for particion in self.particiones)
+
+    def obtener(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return self._particion(user_id).obtener(user_id)
+
+    def crear(self, name: str, email: str) -> Dict[str, Any]:
+        with self._transaccion() as cursor:
+            nuevo_id = cursor.execute(
+                "UPDATE meta SET valor = valor + 1 WHERE clave = 'ultimo_id' RETURNING valor"
+            ).fetchone()[0]
+        nuevo = {"id": nuevo_id, "name": name, "email": email}
+        self._particion(nuevo_id).insertar(nuevo)
+        return nuevo
+
+    def actualizar(self, user_id: int, cambios: Dict[str, Any],
+                   versiones: Optional[Set[int]] = None) -> Tuple[Optional[Dict[str, Any]], int]:
+        return self._particion(user_id).actualizar(user_id, cambios, versiones)
+
+    def eliminar(self, user_id: int, versiones: Optional[Set[int]] = None) -> bool:
+        return self._particion(user_id).eliminar(user_id, versiones)
+
+    def disponible(self) -> bool:
+        return all(particion.disponible() for particion in self.particiones)
+
+
+class _Transaccion:
+    """
+    Transacción serializada con el lock del repositorio. ``BEGIN IMMEDIATE``
+    para escrituras; ``BEGIN`` para lecturas que deben ver un mismo instante.
+    """
+
+    def __init__(self, conexion: sqlite3.Connection, lock: threading.Lock, inicio: str):
+        self.conexion = conexion
+        self.lock = lock
+        self.inicio = inicio
+
+    def __enter__(self) -> sqlite3.Cursor:
+        self.lock.acquire()
+        try:
+            self.conexion.execute(self.inicio)
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.conexion.cursor()
+
+    def __exit__(self, tipo, valor, traza):
+        try:
+            self.conexion.execute("COMMIT" if tipo is None else "ROLLBACK")
+        finally:
+            self.lock.release()
+
+
+def crear_repositorio(almacen: Optional[str] = None):
+    """
+    Crea el repositorio indicado por ``almacen`` o, si no se indica, por la
+    variable de entorno MOCK_API_ALMACEN.
+    """
+    almacen = almacen or os.environ.get("MOCK_API_ALMACEN", ALMACEN_POR_DEFECTO)
+
+    if almacen == "memoria":
+        return RepositorioUsuariosMemoria()
+    if almacen.startswith("sqlite:///"):
+        ruta, _, consulta = almacen[len("sqlite:///"):].partition("?")
+        particiones = int(parse_qs(consulta).get("particiones", ["1"])[0])
+        if particiones > 1:
+            return RepositorioUsuariosParticionado(ruta, particiones)
+        return RepositorioUsuariosSQLite(ruta)
+
+    raise ValueError(f"Almacén de usuarios no soportado: {almacen!r}")
@@ -0,0 +1,172 @@
+"""
+Suite de Rendimiento - Mock API Server
+======================================
+
+Mide en proceso los caminos calientes del servidor y del cliente, y compara
+cada métrica (µs por operación) con la baseline guardada en
+benchmarks/baseline.json. Un test falla si su métrica empeora más que el
+umbral (25% por defecto). Las opciones están en conftest.py.
+
+- Repositorio de usuarios (memoria y SQLite) con 1k, 100k y 1M usuarios:
+  obtener, página, crear y eliminar
+- Verificación de autenticación básica y bearer
+- Codificación JSON de páginas de usuarios
+- Round-trips del cliente requests con y sin pool de conexiones
+
+Para ejecutar (no necesita el servidor en ejecución):
+    pytest bench.py -v                       # comparar con la baseline
+    pytest bench.py --bench-actualizar       # medir y guardar una nueva baseline
+    pytest bench.py --bench-tamanos 1000,100000 -k "not cliente"
+
+La primera vez (o en otra máquina) no hay baseline: los tests solo miden.
+Los resultados de la última ejecución quedan en benchmarks/resultados_bench.json.
+"""
+
+import socket
+import threading
+import time
+
+import pytest
+import requests
+from fastapi.responses import JSONResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBasicCredentials
+
+from almacenamiento.usuarios_repositorio import RepositorioUsuariosMemoria, RepositorioUsuariosSQLite
+from benchmarks.bench_serializacion import usuarios_sinteticos
+from endpoints.autenticacion_endpoint import verify_basic_auth, verify_bearer_token
+from utilidades.serializacion import codificar
+
+
+pytestmark = pytest.mark.bench
+
+
+def medir(operacion, rondas: int = 5, tiempo_minimo: float = 0.05) -> float:
+    """
+    Microsegundos por llamada a ``operacion``: el mínimo entre ``rondas``
+    rondas, cada una con suficientes repeticiones para durar al menos
+    ``tiempo_minimo`` segundos. El mínimo es la estimación menos afectada
+    por el ruido de otros procesos.
+    """
+    repeticiones = 1
+    while True:
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            operacion()
+        duracion = time.perf_counter() - inicio
+        if duracion >= tiempo_minimo:
+            break
+        repeticiones = max(repeticiones * 2, int(repeticiones * tiempo_minimo / max(duracion, 1e-9)))
+
+    mejor = duracion / repeticiones
+    for _ in range(rondas - 1):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            operacion()
+        mejor = min(mejor, (time.perf_counter() - inicio) / repeticiones)
+    return mejor * 1_000_000
+
+
+# =============================================================================
+# 🗄️ REPOSITORIO DE USUARIOS
+# =============================================================================
+
+@pytest.fixture(scope="module", params=["memoria", "sqlite"])
+def repositorio(request, tamano, tmp_path_factory):
+    usuarios = usuarios_sinteticos(tamano)
+    if request.param == "memoria":
+        return request.param, RepositorioUsuariosMemoria(usuarios)
+    ruta = tmp_path_factory.mktemp("bench") / f"usuarios_{tamano}.db"
+    return request.param, RepositorioUsuariosSQLite(str(ruta), usuarios)
+
+
+class TestRepositorio:
+
+    def test_obtener(self, repositorio, tamano, registro_bench):
+        almacen, repo = repositorio
+        user_id = tamano // 2
+        registro_bench.registrar(f"repositorio.{almacen}.{tamano}.obtener", medir(lambda: repo.obtener(user_id)))
+
+    def test_pagina(self, repositorio, tamano, registro_bench):
+        almacen, repo = repositorio
+        inicio = tamano // 2
+        registro_bench.registrar(f"repositorio.{almacen}.{tamano}.pagina",
+                                 medir(lambda: repo.pagina(inicio, inicio + 50)))
+
+    def test_crear_y_eliminar(self, repositorio, tamano, registro_bench):
+        almacen, repo = repositorio
+
+        def crear_y_eliminar():
+            # El tamaño del almacén no cambia entre repeticiones
+            repo.eliminar(repo.crear("Bench", "bench@example.com")["id"])
+
+        registro_bench.registrar(f"repositorio.{almacen}.{tamano}.crear_eliminar",
+                                 medir(crear_y_eliminar, rondas=3))
+
+
+# =============================================================================
+# 🔐 AUTENTICACIÓN
+# =============================================================================
+
+class TestAutenticacion:
+
+    def test_basic_auth(self, registro_bench):
+        credenciales = HTTPBasicCredentials(username="admin", password="password")
+        registro_bench.registrar("auth.basic", medir(lambda: verify_basic_auth(credenciales)))
+
+    def test_bearer(self, registro_bench):
+        credenciales = HTTPAuthorizationCredentials(scheme="Bearer", credentials="secrettoken")
+        registro_bench.registrar("auth.bearer", medir(lambda: verify_bearer_token(credenciales)))
+
+
+# =============================================================================
+# 🧾 CODIFICACIÓN JSON DE PÁGINAS
+# =============================================================================
+
+class TestCodificacion:
+
+    @pytest.mark.parametrize("limit", [10, 100])
+    def test_pagina_usuarios(self, limit, registro_bench):
+        pagina = {"users": usuarios_sinteticos(limit), "page": 1, "limit": limit, "total": 1000}
+        registro_bench.registrar(f"json.pagina_{limit}.codificar", medir(lambda: codificar(pagina)))
+        registro_bench.registrar(f"json.pagina_{limit}.jsonresponse", medir(lambda: JSONResponse(pagina)))
+
+
+# =============================================================================
+# 🌐 ROUND-TRIPS DEL CLIENTE
+# =============================================================================
+
+@pytest.fixture(scope="module")
+def servidor():
+    """Mock API Server real (uvicorn) en un hilo y un puerto libre"""
+    import uvicorn
+
+    from mock_api_server_fastapi import crear_app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        puerto = sock.getsockname()[1]
+    servidor = uvicorn.Server(uvicorn.Config(crear_app(), host="127.0.0.1", port=puerto,
+                                             log_level="warning", access_log=False))
+    hilo = threading.Thread(target=servidor.run, daemon=True)
+    hilo.start()
+    limite = time.monotonic() + 10
+    while not servidor.started:
+        if time.monotonic() > limite:
+            pytest.fail("El servidor de benchmark no arrancó")
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{puerto}"
+    servidor.should_exit = True
+    hilo.join(timeout=5)
+
+
+class TestCliente:
+
+    def test_sin_pool(self, servidor, registro_bench):
+        # Una conexión TCP nueva por petición
+        registro_bench.registrar("cliente.get_user.sin_pool",
+                                 medir(lambda: requests.get(f"{servidor}/users/1"), rondas=3))
+
+    def test_con_pool(self, servidor, registro_bench):
+        with requests.Session() as sesion:
+            registro_bench.registrar("cliente.get_user.con_pool",
+                                     medir(lambda: sesion.get(f"{servidor}/users/1"), rondas=3))
@@ -0,0 +1,83 @@
+"""
+Benchmark de la caché de páginas de GET /users
+==============================================
+
+Compara el throughput de lectura de GET /users con y sin la caché de
+páginas codificadas. Las peticiones recorren un conjunto fijo de páginas y,
+opcionalmente, intercalan escrituras (PUT) que invalidan la caché.
+
+Las peticiones se ejecutan en proceso (sin red) para medir solo el servidor.
+
+Para ejecutar (desde la raíz del proyecto):
+    python -m benchmarks.bench_cache_paginas
+    python -m benchmarks.bench_cache_paginas --usuarios 10000 --limit 100 --escrituras 0.01
+    MOCK_API_ALMACEN=sqlite:///tmp/bench.db python -m benchmarks.bench_cache_paginas
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from almacenamiento.cache_paginas import CachePaginas
+from almacenamiento.usuarios_repositorio import RepositorioUsuariosMemoria, crear_repositorio
+from benchmarks.bench_serializacion import usuarios_sinteticos
+from endpoints.usuarios_endpoint import UsuariosEndPoint
+from mock_api_server_fastapi import app
+from utilidades.asgi_local import llamar_asgi
+
+
+CABECERAS_JSON = {"content-type": "application/json"}
+
+
+async def medir(urls, peticiones: int, escrituras: float) -> float:
+    """Peticiones de lectura por segundo"""
+    # Calentamiento (caches de rutas, imports perezosos, etc.)
+    for url in urls:
+        await llamar_asgi(app, "GET", url)
+
+    cada = int(1 / escrituras) if escrituras > 0 else 0
+    inicio = time.perf_counter()
+    for numero in range(peticiones):
+        if cada and numero % cada == 0:
+            await llamar_asgi(app, "PUT", "/users/1", headers=CABECERAS_JSON, body=b'{"name": "Bench"}')
+        status, _, _ = await llamar_asgi(app, "GET", urls[numero % len(urls)])
+        assert status == 200
+    return peticiones / (time.perf_counter() - inicio)
+
+
+async def ejecutar(usuarios: int, peticiones: int, paginas: int, limit: int, escrituras: float):
+    if "MOCK_API_ALMACEN" in os.environ:
+        UsuariosEndPoint.repositorio = crear_repositorio()
+        for usuario in usuarios_sinteticos(max(usuarios - UsuariosEndPoint.repositorio.total(), 0)):
+            UsuariosEndPoint.repositorio.crear(usuario["name"], usuario["email"])
+    else:
+        UsuariosEndPoint.repositorio = RepositorioUsuariosMemoria(usuarios_sinteticos(usuarios))
+    urls = [f"/users/?page={page}&limit={limit}" for page in range(1, paginas + 1)]
+
+    UsuariosEndPoint.cache_paginas = CachePaginas(capacidad=0)
+    sin_cache = await medir(urls, peticiones, escrituras)
+
+    cache = UsuariosEndPoint.cache_paginas = CachePaginas()
+    con_cache = await medir(urls, peticiones, escrituras)
+
+    estadisticas = cache.estadisticas()
+    print(f"Almacén: {type(UsuariosEndPoint.repositorio).__name__} ({UsuariosEndPoint.repositorio.total()} usuarios)")
+    print(f"Páginas: {paginas} x limit={limit}, escrituras: {escrituras:.1%} de las lecturas")
+    print(f"{'sin caché':<12}{sin_cache:>12.0f} req/s")
+    print(f"{'con caché':<12}{con_cache:>12.0f} req/s  ({con_cache / sin_cache:.2f}x)")
+    print(f"Aciertos: {estadisticas['hit_ratio']:.1%}, bytes en caché: {estadisticas['bytes']}, "
+          f"invalidaciones: {estadisticas['invalidations']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=1000, help="Usuarios en el almacén")
+    parser.add_argument("--peticiones", type=int, default=5000, help="Lecturas medidas por modo")
+    parser.add_argument("--paginas", type=int, default=10, help="Páginas distintas consultadas")
+    parser.add_argument("--limit", type=int, default=50, help="Usuarios por página")
+    parser.add_argument("--escrituras", type=float, default=0.0,
+                        help="Escrituras por lectura (0.01 = un PUT cada 100 lecturas)")
+    argumentos = parser.parse_args()
+    asyncio.run(ejecutar(argumentos.usuarios, argumentos.peticiones, argumentos.paginas,
+                         argumentos.limit, argumentos.escrituras))
@@ -0,0 +1,106 @@
+"""
+Benchmark de escalado del almacén de usuarios con varios procesos
+=================================================================
+
+Lanza P procesos (como los workers de uvicorn) que ejecutan a la vez una
+mezcla de lecturas y escrituras directamente sobre el repositorio, y compara
+un único archivo SQLite con el almacén particionado. Con un solo archivo
+todas las escrituras esperan el mismo lock; con N particiones solo compiten
+las que caen en la misma partición.
+
+Cada configuración se mide con 1, 2, 4... hasta --procesos procesos. El
+escalado ideal es lineal: la columna "x" debería acercarse al número de
+procesos mientras haya núcleos libres.
+
+Para ejecutar (desde la raíz del proyecto):
+    python -m benchmarks.bench_particiones
+    python -m benchmarks.bench_particiones --procesos 8 --particiones 8 --escrituras 0.5
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from almacenamiento.usuarios_repositorio import crear_repositorio
+
+
+def trabajador(almacen: str, usuarios: int, duracion: float, escrituras: float, inicio, resultados):
+    repositorio = crear_repositorio(almacen)
+    aleatorio = random.Random(os.getpid())
+    inicio.wait()
+
+    operaciones = 0
+    fin = time.perf_counter() + duracion
+    while time.perf_counter() < fin:
+        user_id = aleatorio.randint(1, usuarios)
+        if aleatorio.random() < escrituras:
+            repositorio.actualizar(user_id, {"name": f"Usuario {operaciones}"})
+        else:
+            repositorio.obtener_con_version(user_id)
+        operaciones += 1
+    resultados.put(operaciones)
+
+
+def medir(almacen: str, procesos: int, usuarios: int, duracion: float, escrituras: float) -> float:
+    """Operaciones por segundo sumando todos los procesos"""
+    inicio = multiprocessing.Barrier(procesos + 1)
+    resultados = multiprocessing.Queue()
+    hijos = [
+        multiprocessing.Process(target=trabajador, args=(almacen, usuarios, duracion, escrituras, inicio, resultados))
+        for _ in range(procesos)
+    ]
+    for hijo in hijos:
+        hijo.start()
+    inicio.wait()
+    total = sum(resultados.get() for _ in hijos)
+    for hijo in hijos:
+        hijo.join()
+    return total / duracion
+
+
+def preparar(almacen: str, usuarios: int):
+    repositorio = crear_repositorio(almacen)
+    for numero in range(repositorio.total(), usuarios):
+        repositorio.crear(f"Usuario {numero}", f"usuario{numero}@example.com")
+
+
+def ejecutar(procesos: int, particiones: int, usuarios: int, duracion: float, escrituras: float):
+    directorio = tempfile.mkdtemp(prefix="mock_api_bench_")
+    almacenes = {
+        "sqlite (1 archivo)": f"sqlite:///{os.path.join(directorio, 'unico.db')}",
+        f"particionado ({particiones})": f"sqlite:///{os.path.join(directorio, 'particionado.db')}?particiones={particiones}",
+    }
+    cantidades = [1]
+    while cantidades[-1] * 2 <= procesos:
+        cantidades.append(cantidades[-1] * 2)
+    if cantidades[-1] != procesos:
+        cantidades.append(procesos)
+
+    print(f"Núcleos: {os.cpu_count()}, usuarios: {usuarios}, escrituras: {escrituras:.0%}, {duracion:.1f} s por medición")
+    print(f"{'Almacén':<22}" + "".join(f"{f'{p} proc':>16}" for p in cantidades))
+    print("-" * (22 + 16 * len(cantidades)))
+    for nombre, almacen in almacenes.items():
+        preparar(almacen, usuarios)
+        columnas = []
+        base = None
+        for cantidad in cantidades:
+            ops = medir(almacen, cantidad, usuarios, duracion, escrituras)
+            base = base or ops
+            columnas.append(f"{ops:>9.0f} {ops / base:>4.1f}x")
+        print(f"{nombre:<22}" + "".join(f"{columna:>16}" for columna in columnas))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1, help="Máximo de procesos concurrentes")
+    parser.add_argument("--particiones", type=int, default=max(os.cpu_count() or 1, 2),
+                        help="Particiones del almacén particionado")
+    parser.add_argument("--usuarios", type=int, default=10000, help="Usuarios en el almacén")
+    parser.add_argument("--duracion", type=float, default=3.0, help="Segundos por medición")
+    parser.add_argument("--escrituras", type=float, default=0.2, help="Fracción de operaciones que son escrituras")
+    argumentos = parser.parse_args()
+    ejecutar(argumentos.procesos, argumentos.particiones, argumentos.usuarios,
+             argumentos.duracion, argumentos.escrituras)
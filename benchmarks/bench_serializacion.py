@@ -0,0 +1,71 @@
+"""
+Micro-benchmark de serialización JSON
+=====================================
+
+Mide el tiempo de CPU por petición de los endpoints calientes de usuarios,
+con el camino normal de FastAPI (validación contra response_model + json
+estándar) y con el modo rápido de utilidades/serializacion.py.
+
+Las peticiones se ejecutan en proceso (sin red) para medir solo el servidor.
+
+Para ejecutar (desde la raíz del proyecto):
+    python -m benchmarks.bench_serializacion
+    python -m benchmarks.bench_serializacion --usuarios 1000 --peticiones 5000
+"""
+
+import argparse
+import asyncio
+import time
+
+from almacenamiento.cache_paginas import CachePaginas
+from almacenamiento.usuarios_repositorio import RepositorioUsuariosMemoria
+from endpoints.usuarios_endpoint import UsuariosEndPoint
+from mock_api_server_fastapi import app
+from utilidades import serializacion
+from utilidades.asgi_local import llamar_asgi
+
+
+def usuarios_sinteticos(cantidad: int):
+    return [{"id": i, "name": f"Usuario {i}", "email": f"usuario{i}@example.com"} for i in range(1, cantidad + 1)]
+
+
+async def medir(url: str, peticiones: int) -> float:
+    """Microsegundos de CPU por petición"""
+    # Calentamiento (caches de rutas, imports perezosos, etc.)
+    for _ in range(50):
+        await llamar_asgi(app, "GET", url)
+
+    inicio = time.process_time()
+    for _ in range(peticiones):
+        await llamar_asgi(app, "GET", url)
+    return (time.process_time() - inicio) / peticiones * 1_000_000
+
+
+async def ejecutar(usuarios: int, peticiones: int):
+    UsuariosEndPoint.repositorio = RepositorioUsuariosMemoria(usuarios_sinteticos(usuarios))
+    # Sin caché de páginas: se mide la serialización, no los aciertos
+    UsuariosEndPoint.cache_paginas = CachePaginas(capacidad=0)
+    urls = ["/users/", "/users/?limit=100", f"/users/{usuarios // 2}"]
+
+    print(f"orjson disponible: {'sí' if serializacion.orjson is not None else 'no'}")
+    print(f"{'Endpoint':<24}{'normal (µs)':>14}{'rápido (µs)':>14}{'mejora':>10}")
+    print("-" * 62)
+    for url in urls:
+        serializacion.configurar(False)
+        _, _, cuerpo_normal = await llamar_asgi(app, "GET", url)
+        normal = await medir(url, peticiones)
+
+        serializacion.configurar(True)
+        _, _, cuerpo_rapido = await llamar_asgi(app, "GET", url)
+        rapido = await medir(url, peticiones)
+
+        assert cuerpo_normal == cuerpo_rapido, f"Las respuestas de {url} difieren entre modos"
+        print(f"GET {url:<20}{normal:>14.1f}{rapido:>14.1f}{normal / rapido:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--usuarios", type=int, default=1000, help="Usuarios en el almacén")
+    parser.add_argument("--peticiones", type=int, default=2000, help="Peticiones medidas por endpoint y modo")
+    argumentos = parser.parse_args()
+    asyncio.run(ejecutar(argumentos.usuarios, argumentos.peticiones))
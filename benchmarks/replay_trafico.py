@@ -0,0 +1,176 @@
+"""
+Reproducción de tráfico grabado
+===============================
+
+Lee un archivo JSONL grabado por el servidor (--grabar / MOCK_API_GRABAR) y
+vuelve a enviar cada petición contra un servidor en ejecución. El archivo se
+lee en streaming, línea por línea, así que su tamaño no limita la memoria.
+
+Modos de ritmo:
+    --velocidad 1     Respeta los tiempos originales entre peticiones
+    --velocidad 10    Diez veces más rápido que el tráfico original
+    --velocidad 0     Tan rápido como lo permita la concurrencia (por defecto)
+
+Los registros que no se pueden reproducir tal cual (streams SSE de
+GET /users/changes, que no terminan, o peticiones cuyo cuerpo se grabó
+truncado) se omiten y se cuentan aparte.
+
+Para ejecutar (desde la raíz del proyecto):
+    python -m benchmarks.replay_trafico requests.jsonl
+    python -m benchmarks.replay_trafico requests.jsonl --velocidad 1 --concurrencia 50
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import time
+from typing import Any, Dict, Iterator, Optional
+
+import aiohttp
+
+from middleware.metricas_middleware import HistogramaLatencia
+
+
+# Cabeceras que dependen de la conexión original y no deben reenviarse
+CABECERAS_EXCLUIDAS = {"host", "content-length", "connection", "transfer-encoding", "keep-alive"}
+
+
+def leer_registros(ruta: str) -> Iterator[Dict[str, Any]]:
+    """Registros del archivo JSONL, uno a la vez"""
+    with open(ruta, encoding="utf-8") as archivo:
+        for linea in archivo:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+def motivo_omision(registro: Dict[str, Any]) -> Optional[str]:
+    """Por qué un registro no se reproduce (None si se puede reproducir)"""
+    cabeceras = {nombre.lower(): valor for nombre, valor in registro.get("response_headers", {}).items()}
+    if cabeceras.get("content-type", "").startswith("text/event-stream"):
+        # El stream no termina: leer la respuesta esperaría hasta el timeout
+        return "stream SSE"
+    if (registro.get("body") or {}).get("truncated"):
+        # Enviar el cuerpo cortado daría otro status (p. ej. 422) sin que sea una regresión
+        return "cuerpo truncado"
+    return None
+
+
+def cuerpo_original(registro: Dict[str, Any]) -> bytes:
+    cuerpo = registro.get("body") or {}
+    if "base64" in cuerpo:
+        return base64.b64decode(cuerpo["base64"])
+    return cuerpo.get("text", "").encode("utf-8")
+
+
+class ResultadoReplay:
+    """Totales de la reproducción"""
+
+    def __init__(self):
+        self.enviadas = 0
+        self.errores = 0
+        self.timeouts = 0
+        self.status_distinto = 0
+        self.omitidas: Dict[str, int] = {}
+        self.status: Dict[int, int] = {}
+        self.latencia = HistogramaLatencia()
+
+    def imprimir(self, duracion: float):
+        print(f"📨 Peticiones enviadas: {self.enviadas} en {duracion:.2f} s "
+              f"({self.enviadas / duracion if duracion else 0:.0f} req/s)")
+        print(f"📊 Status: {dict(sorted(self.status.items()))}")
+        print(f"⚠️  Status distinto al grabado: {self.status_distinto}")
+        print(f"❌ Errores de conexión: {self.errores}")
+        print(f"⌛ Sin respuesta a tiempo: {self.timeouts}")
+        if self.omitidas:
+            print(f"⏭️  Omitidas: {self.omitidas}")
+        print(f"⏱️  Latencia (ms): p50={self.latencia.percentil(50) / 1000:.2f} "
+              f"p90={self.latencia.percentil(90) / 1000:.2f} "
+              f"p99={self.latencia.percentil(99) / 1000:.2f} "
+              f"max={self.latencia.max_us / 1000:.2f}")
+
+
+async def enviar(sesion: aiohttp.ClientSession, base_url: str, registro: Dict[str, Any], resultado: ResultadoReplay):
+    motivo = motivo_omision(registro)
+    if motivo is not None:
+        resultado.omitidas[motivo] = resultado.omitidas.get(motivo, 0) + 1
+        return
+
+    url = base_url + registro["path"] + (f"?{registro['query']}" if registro.get("query") else "")
+    cabeceras = {
+        nombre: valor for nombre, valor in registro.get("headers", {}).items()
+        if nombre.lower() not in CABECERAS_EXCLUIDAS
+    }
+
+    inicio = time.perf_counter_ns()
+    try:
+        async with sesion.request(registro["method"], url, headers=cabeceras, data=cuerpo_original(registro)) as respuesta:
+            await respuesta.read()
+            status = respuesta.status
+    except aiohttp.ClientError:
+        resultado.errores += 1
+        return
+    except asyncio.TimeoutError:
+        resultado.timeouts += 1
+        return
+    finally:
+        resultado.enviadas += 1
+
+    resultado.latencia.registrar((time.perf_counter_ns() - inicio) // 1000)
+    resultado.status[status] = resultado.status.get(status, 0) + 1
+    if status != registro.get("status"):
+        resultado.status_distinto += 1
+
+
+async def reproducir(ruta: str, base_url: str, velocidad: float, concurrencia: int,
+                     limite: Optional[int] = None, timeout: float = 30.0) -> ResultadoReplay:
+    resultado = ResultadoReplay()
+    # Cola acotada: el lector nunca adelanta más de 2x la concurrencia
+    cola: asyncio.Queue = asyncio.Queue(maxsize=concurrencia * 2)
+    conector = aiohttp.TCPConnector(limit=concurrencia)
+
+    async with aiohttp.ClientSession(connector=conector, timeout=aiohttp.ClientTimeout(total=timeout)) as sesion:
+        async def trabajador():
+            while True:
+                registro = await cola.get()
+                if registro is None:
+                    return
+                await enviar(sesion, base_url, registro, resultado)
+
+        trabajadores = [asyncio.create_task(trabajador()) for _ in range(concurrencia)]
+
+        ts_inicial = None
+        inicio = time.monotonic()
+        for numero, registro in enumerate(leer_registros(ruta)):
+            if limite is not None and numero >= limite:
+                break
+            if velocidad > 0:
+                ts_inicial = registro["ts"] if ts_inicial is None else ts_inicial
+                espera = inicio + (registro["ts"] - ts_inicial) / velocidad - time.monotonic()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+            await cola.put(registro)
+
+        for _ in trabajadores:
+            await cola.put(None)
+        await asyncio.gather(*trabajadores)
+
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archivo", nargs="?", default="requests.jsonl", help="Archivo JSONL grabado")
+    parser.add_argument("--url", default="http://localhost:8000", help="Servidor contra el que reproducir")
+    parser.add_argument("--velocidad", type=float, default=0, help="Factor de tiempo (0 = sin esperas)")
+    parser.add_argument("--concurrencia", type=int, default=20, help="Peticiones simultáneas máximas")
+    parser.add_argument("--limite", type=int, default=None, help="Reproducir solo las primeras N peticiones")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Segundos máximos por petición")
+    argumentos = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resultado = asyncio.run(reproducir(
+        argumentos.archivo, argumentos.url.rstrip("/"), argumentos.velocidad,
+        argumentos.concurrencia, argumentos.limite, argumentos.timeout
+    ))
+    resultado.imprimir(time.perf_counter() - inicio)
@@ -0,0 +1,138 @@
+"""
+Configuración de pytest
+=======================
+
+Fixtures compartidas por los tests unitarios que usan la app en proceso
+(``usuarios_aislados`` y ``app``).
+
+Registra además el marcador ``bench`` y las opciones de la suite de rendimiento
+(bench.py). Los benchmarks comparan cada métrica con su baseline en JSON y
+fallan si empeora más que el umbral configurado.
+
+    pytest bench.py                          # comparar con benchmarks/baseline.json
+    pytest bench.py --bench-actualizar       # guardar los resultados como baseline
+    pytest bench.py --bench-umbral 0.5       # tolerar hasta un 50% más lento
+    pytest bench.py --bench-tamanos 1000     # solo el almacén de 1k usuarios
+"""
+
+import json
+import os
+import platform
+import sys
+from typing import Dict, Optional
+
+import pytest
+
+
+DIRECTORIO_BENCHMARKS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+BASELINE_POR_DEFECTO = os.path.join(DIRECTORIO_BENCHMARKS, "baseline.json")
+RESULTADOS = os.path.join(DIRECTORIO_BENCHMARKS, "resultados_bench.json")
+
+
+def pytest_addoption(parser):
+    grupo = parser.getgroup("bench", "Suite de rendimiento (bench.py)")
+    grupo.addoption("--bench-baseline", default=os.environ.get("MOCK_API_BENCH_BASELINE", BASELINE_POR_DEFECTO),
+                    help="Archivo JSON con las métricas de referencia")
+    grupo.addoption("--bench-umbral", type=float, default=float(os.environ.get("MOCK_API_BENCH_UMBRAL", "0.25")),
+                    help="Empeoramiento tolerado respecto a la baseline (0.25 = 25%% más lento)")
+    grupo.addoption("--bench-actualizar", action="store_true",
+                    help="Guardar los resultados como nueva baseline en lugar de comparar")
+    grupo.addoption("--bench-tamanos", default=os.environ.get("MOCK_API_BENCH_TAMANOS", "1000,100000,1000000"),
+                    help="Cantidades de usuarios de los almacenes medidos, separadas por comas")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "bench: benchmark de rendimiento comparado contra una baseline (ver bench.py)")
+
+
+def pytest_generate_tests(metafunc):
+    if "tamano" in metafunc.fixturenames:
+        tamanos = [int(valor) for valor in metafunc.config.getoption("--bench-tamanos").split(",") if valor]
+        metafunc.parametrize("tamano", tamanos, scope="module", ids=[f"{t // 1000}k" if t % 1000 == 0 else str(t) for t in tamanos])
+
+
+@pytest.fixture
+def usuarios_aislados(monkeypatch):
+    """
+    Almacén de usuarios nuevo, con caché de páginas y feed de cambios vacíos,
+    para que ningún test vea datos, páginas cacheadas o eventos de otro.
+    """
+    from almacenamiento.cache_paginas import CachePaginas
+    from almacenamiento.feed_cambios import FeedCambios
+    from almacenamiento.usuarios_repositorio import RepositorioUsuariosMemoria
+    from endpoints.usuarios_endpoint import UsuariosEndPoint
+
+    monkeypatch.setattr(UsuariosEndPoint, "repositorio", RepositorioUsuariosMemoria())
+    monkeypatch.setattr(UsuariosEndPoint, "cache_paginas", CachePaginas())
+    monkeypatch.setattr(UsuariosEndPoint, "feed_cambios", FeedCambios())
+    return UsuariosEndPoint
+
+
+@pytest.fixture
+def app(usuarios_aislados):
+    """App construida con crear_app() sobre un almacén aislado"""
+    from mock_api_server_fastapi import crear_app
+
+    return crear_app()
+
+
+class RegistroBench:
+    """Métricas medidas en la sesión (microsegundos por operación; menor es mejor)"""
+
+    def __init__(self, baseline: str, umbral: float, actualizar: bool):
+        self.ruta_baseline = baseline
+        self.umbral = umbral
+        self.actualizar = actualizar
+        self.resultados: Dict[str, float] = {}
+        self.baseline: Dict[str, float] = {}
+        if os.path.exists(baseline):
+            with open(baseline, encoding="utf-8") as archivo:
+                self.baseline = json.load(archivo).get("metricas", {})
+
+    def registrar(self, nombre: str, microsegundos: float):
+        """Guarda la métrica y falla el test si empeoró más que el umbral"""
+        self.resultados[nombre] = round(microsegundos, 3)
+        referencia: Optional[float] = self.baseline.get(nombre)
+        if self.actualizar or referencia is None:
+            return
+        limite = referencia * (1 + self.umbral)
+        if microsegundos > limite:
+            pytest.fail(
+                f"Regresión en {nombre}: {microsegundos:.2f} µs/op vs baseline {referencia:.2f} µs/op "
+                f"(+{(microsegundos / referencia - 1):.0%}, umbral +{self.umbral:.0%})",
+                pytrace=False
+            )
+
+    def guardar(self):
+        contenido = {
+            "entorno": {
+                "python": sys.version.split()[0],
+                "plataforma": platform.platform(),
+                "procesador": platform.processor() or platform.machine(),
+                "nucleos": os.cpu_count(),
+            },
+            "metricas": dict(sorted(self.resultados.items())),
+        }
+        destinos = [RESULTADOS]
+        if self.actualizar:
+            # Se conservan las métricas de la baseline que no se midieron esta vez
+            contenido["metricas"] = dict(sorted({**self.baseline, **self.resultados}.items()))
+            destinos.append(self.ruta_baseline)
+        for destino in destinos:
+            os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+            with open(destino, "w", encoding="utf-8") as archivo:
+                json.dump(contenido, archivo, indent=2, ensure_ascii=False)
+                archivo.write("\n")
+
+
+@pytest.fixture(scope="session")
+def registro_bench(request):
+    config = request.config
+    registro = RegistroBench(
+        config.getoption("--bench-baseline"),
+        config.getoption("--bench-umbral"),
+        config.getoption("--bench-actualizar"),
+    )
+    yield registro
+    if registro.resultados:
+        registro.guardar()
@@ -0,0 +1,259 @@
+"""
+Endpoint para ejecutar varias peticiones en un solo round-trip
+"""
+
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
+
+from utilidades.asgi_local import llamar_asgi
+
+
+# Máximo de sub-peticiones por lote
+MAX_PETICIONES = 50
+
+# Referencia a la respuesta de otro paso: ${login.body.token}, ${crear.status},
+# ${crear.headers.etag}, ${lista.body.users.0.id}
+_REFERENCIA = re.compile(r"\$\{(?P<paso>[A-Za-z0-9_-]+)\.(?P<campo>status|headers|body)(?P<ruta>(?:\.[^.}]+)*)\}")
+
+
+# Clave que marca el scope ASGI de una sub-petición: los middlewares de
+# grabación y métricas no la cuentan, porque el POST /batch ya lo hace
+SCOPE_SUB_PETICION = "batch"
+
+
+# Esquemas de datos
+class SubPeticion(BaseModel):
+    id: Optional[str] = Field(None, description="Nombre del paso (por defecto su posición: '0', '1', ...)")
+    method: str = "GET"
+    path: str = Field(..., description="Path con query string, p. ej. /users/?page=2")
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = Field(None, description="Cuerpo JSON (o texto tal cual si es un string)")
+    form: Optional[Dict[str, str]] = Field(None, description="Cuerpo application/x-www-form-urlencoded")
+    depends_on: List[str] = Field([], description="Pasos que deben terminar antes, además de los referenciados")
+
+class Lote(BaseModel):
+    requests: List[SubPeticion]
+
+
+class DependenciaFallida(Exception):
+    """Un paso del que depende la sub-petición falló o no tiene el valor referenciado"""
+
+
+def _referencias(valor: Any) -> List[str]:
+    """Pasos referenciados dentro de un string, lista o diccionario"""
+    if isinstance(valor, str):
+        return [coincidencia["paso"] for coincidencia in _REFERENCIA.finditer(valor)]
+    if isinstance(valor, list):
+        return [paso for elemento in valor for paso in _referencias(elemento)]
+    if isinstance(valor, dict):
+        return [paso for elemento in valor.values() for paso in _referencias(elemento)]
+    return []
+
+
+def _valor_referenciado(coincidencia: re.Match, resultados: Dict[str, Dict[str, Any]]) -> Any:
+    resultado = resultados[coincidencia["paso"]]
+    if resultado["status"] >= 400:
+        raise DependenciaFallida(f"step '{coincidencia['paso']}' failed with status {resultado['status']}")
+
+    valor = resultado[coincidencia["campo"]]
+    for clave in coincidencia["ruta"].split(".")[1:]:
+        if coincidencia["campo"] == "headers":
+            clave = clave.lower()
+        try:
+            valor = valor[int(clave)] if isinstance(valor, list) else valor[clave]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise DependenciaFallida(f"'{coincidencia.group(0)}' not found in step '{coincidencia['paso']}'")
+    return valor
+
+
+def resolver(valor: Any, resultados: Dict[str, Dict[str, Any]]) -> Any:
+    """
+    Reemplaza las referencias ``${paso.campo...}`` por los valores de las
+    respuestas ya obtenidas. Un string que es solo una referencia toma el
+    valor con su tipo original (número, objeto...).
+    """
+    if isinstance(valor, str):
+        completa = _REFERENCIA.fullmatch(valor)
+        if completa:
+            return _valor_referenciado(completa, resultados)
+        return _REFERENCIA.sub(lambda c: str(_valor_referenciado(c, resultados)), valor)
+    if isinstance(valor, list):
+        return [resolver(elemento, resultados) for elemento in valor]
+    if isinstance(valor, dict):
+        return {clave: resolver(elemento, resultados) for clave, elemento in valor.items()}
+    return valor
+
+
+def _path_valido(path: str) -> bool:
+    """Path absoluto y distinto de /batch (no se permiten lotes anidados)"""
+    return path.startswith("/") and urlsplit(path).path.rstrip("/") != "/batch"
+
+
+def planificar(peticiones: List[SubPeticion]) -> Dict[str, List[str]]:
+    """
+    Dependencias de cada paso (id -> ids). Valida ids repetidos o
+    desconocidos, ciclos y paths literales inválidos o a /batch.
+    """
+    dependencias: Dict[str, List[str]] = {}
+    for posicion, peticion in enumerate(peticiones):
+        paso = peticion.id if peticion.id is not None else str(posicion)
+        if paso in dependencias:
+            raise HTTPException(status_code=400, detail=f"Duplicate step id '{paso}'")
+        # Los paths con referencias se validan en ejecutar_lote(), ya resueltos
+        if not _REFERENCIA.search(peticion.path) and not _path_valido(peticion.path):
+            raise HTTPException(status_code=400, detail=f"Invalid path for step '{paso}'")
+        referenciados = _referencias([peticion.path, peticion.headers, peticion.body, peticion.form])
+        dependencias[paso] = list(dict.fromkeys(peticion.depends_on + referenciados))
+
+    for paso, requeridos in dependencias.items():
+        for requerido in requeridos:
+            if requerido not in dependencias:
+                raise HTTPException(status_code=400, detail=f"Step '{paso}' depends on unknown step '{requerido}'")
+
+    # Detección de ciclos (DFS iterativo con colores)
+    estado: Dict[str, int] = {}
+    for inicial in dependencias:
+        if estado.get(inicial):
+            continue
+        estado[inicial] = 1
+        pila = [(inicial, iter(dependencias[inicial]))]
+        while pila:
+            paso, pendientes = pila[-1]
+            siguiente = next(pendientes, None)
+            if siguiente is None:
+                estado[paso] = 2
+                pila.pop()
+            elif estado.get(siguiente) == 1:
+                raise HTTPException(status_code=400, detail=f"Dependency cycle involving step '{siguiente}'")
+            elif not estado.get(siguiente):
+                estado[siguiente] = 1
+                pila.append((siguiente, iter(dependencias[siguiente])))
+    return dependencias
+
+
+def _resultado_error(paso: str, status: int, detalle: str) -> Dict[str, Any]:
+    return {"id": paso, "status": status, "headers": {}, "body": {"detail": detalle}}
+
+
+def _codificable(path: str, headers: Dict[str, str]) -> bool:
+    """True si el query string y los headers se pueden enviar en HTTP (Latin-1)"""
+    try:
+        urlsplit(path).query.encode("latin-1")
+        for nombre, valor in headers.items():
+            nombre.encode("latin-1")
+            valor.encode("latin-1")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def _respuesta_a_resultado(paso: str, status: int, cabeceras, cuerpo: bytes) -> Dict[str, Any]:
+    headers = {nombre.decode("latin-1"): valor.decode("latin-1") for nombre, valor in cabeceras}
+    if not cuerpo:
+        contenido = None
+    elif headers.get("content-type", "").startswith("application/json"):
+        contenido = json.loads(cuerpo)
+    else:
+        contenido = cuerpo.decode("utf-8", errors="replace")
+    return {"id": paso, "status": status, "headers": headers, "body": contenido}
+
+
+async def ejecutar_lote(app, peticiones: List[SubPeticion], cabeceras_comunes: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    Ejecuta las sub-peticiones contra ``app`` en el mismo proceso. Cada paso
+    arranca en cuanto terminan los pasos de los que depende, así que los
+    independientes corren de forma concurrente.
+
+    Un paso que falla (incluso si el endpoint lanza una excepción) solo
+    afecta a su propio resultado y a los pasos que dependen de él.
+    """
+    dependencias = planificar(peticiones)
+    pasos = list(dependencias)
+    resultados: Dict[str, Dict[str, Any]] = {}
+    tareas: Dict[str, asyncio.Task] = {}
+
+    async def ejecutar(paso: str, peticion: SubPeticion):
+        if dependencias[paso]:
+            await asyncio.gather(*(tareas[requerido] for requerido in dependencias[paso]))
+        fallidos = [requerido for requerido in dependencias[paso] if resultados[requerido]["status"] >= 400]
+        try:
+            if fallidos:
+                raise DependenciaFallida(f"step '{fallidos[0]}' failed with status {resultados[fallidos[0]]['status']}")
+            path = resolver(peticion.path, resultados)
+            headers = dict(cabeceras_comunes)
+            headers.update((nombre.lower(), str(valor)) for nombre, valor in resolver(peticion.headers, resultados).items())
+            if peticion.form is not None:
+                body = urlencode(resolver(peticion.form, resultados)).encode("utf-8")
+                headers.setdefault("content-type", "application/x-www-form-urlencoded")
+            elif isinstance(peticion.body, str):
+                body = str(resolver(peticion.body, resultados)).encode("utf-8")
+            elif peticion.body is not None:
+                body = json.dumps(resolver(peticion.body, resultados)).encode("utf-8")
+                headers.setdefault("content-type", "application/json")
+            else:
+                body = b""
+        except DependenciaFallida as error:
+            resultados[paso] = _resultado_error(paso, 424, str(error))
+            return
+
+        # El path ya resuelto puede apuntar a otro lugar que el declarado
+        # (p. ej. "${paso.body.url}"), así que se valida de nuevo
+        path = str(path)
+        if not _path_valido(path):
+            resultados[paso] = _resultado_error(paso, 400, f"Invalid path for step '{paso}'")
+            return
+        if not _codificable(path, headers):
+            resultados[paso] = _resultado_error(paso, 400, f"Headers and query of step '{paso}' must be Latin-1")
+            return
+
+        try:
+            status, cabeceras, cuerpo = await llamar_asgi(app, peticion.method, path, headers=headers, body=body,
+                                                          scope_extra={SCOPE_SUB_PETICION: True})
+            resultados[paso] = _respuesta_a_resultado(paso, status, cabeceras, cuerpo)
+        except Exception as error:
+            # En proceso, ServerErrorMiddleware vuelve a lanzar la excepción
+            # del endpoint: aquí se convierte en el 500 de este paso
+            resultados[paso] = _resultado_error(paso, 500, f"Step '{paso}' failed: {type(error).__name__}")
+
+    for paso, peticion in zip(pasos, peticiones):
+        tareas[paso] = asyncio.ensure_future(ejecutar(paso, peticion))
+    try:
+        await asyncio.gather(*tareas.values())
+    except BaseException:
+        # Lote abortado (p. ej. el cliente se desconectó): no dejar pasos huérfanos
+        for tarea in tareas.values():
+            tarea.cancel()
+        raise
+    return [resultados[paso] for paso in pasos]
+
+
+class BatchEndPoint:
+
+    batch_router = APIRouter()
+
+    @batch_router.post("",
+                       response_model=Dict[str, Any],
+                       summary="Ejecutar un lote de peticiones",
+                       description="Ejecuta varias sub-peticiones en el servidor y retorna el status, "
+                                   "headers y body de cada una en el mismo orden. Un valor puede "
+                                   "referenciar la respuesta de otro paso con ${paso.body.campo}; "
+                                   "los pasos independientes se ejecutan en paralelo")
+    async def batch(lote: Lote, request: Request):
+        """POST /batch - Varias peticiones en un solo round-trip"""
+        if request.scope.get(SCOPE_SUB_PETICION):
+            raise HTTPException(status_code=400, detail="Nested batches are not allowed")
+        if len(lote.requests) > MAX_PETICIONES:
+            raise HTTPException(status_code=400, detail=f"A batch accepts at most {MAX_PETICIONES} requests")
+
+        # La autenticación del lote se aplica a las sub-peticiones que no traen la suya
+        cabeceras_comunes = {}
+        if "authorization" in request.headers:
+            cabeceras_comunes["authorization"] = request.headers["authorization"]
+
+        return {"responses": await ejecutar_lote(request.app, lote.requests, cabeceras_comunes)}
@@ -2,11 +2,22 @@
 Endpoints para información del sistema
 """
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Header, Request
+from fastapi.responses import FileResponse, PlainTextResponse, Response
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import io
+import json
+import os
+import pstats
+import re
 import time
 
+from endpoints.usuarios_endpoint import UsuariosEndPoint, en_repositorio
+from middleware.diagnostico_middleware import directorio_perfiles, token_valido
+from almacenamiento.cache_paginas import estadisticas_como_prometheus, sumar_estadisticas
+from middleware.metricas_middleware import metricas_entre_workers, registro_metricas
+
 
 # Esquemas de datos
 class HealthResponse(BaseModel):
@@ -15,37 +26,139 @@ class HealthResponse(BaseModel):
     endpoints: List[str]
 
 
+def _primera_linea(funcion) -> Optional[str]:
+    """Primera línea del docstring de un endpoint (si tiene)"""
+    documentacion = getattr(funcion, "__doc__", None)
+    if not documentacion:
+        return None
+    return documentacion.strip().splitlines()[0]
+
+
 class SistemaEndPoint:
     
     sistema_router = APIRouter()
 
+    # Inventario de endpoints serializado una sola vez (ver construir_inventario)
+    health_prefijo: Optional[bytes] = None
+    rutas_inventariadas = 0
+
+    # Respuestas constantes para las sondas del balanceador
+    LIVE_BYTES = b'{"status":"alive"}'
+    READY_BYTES = b'{"status":"ready"}'
+
+    @staticmethod
+    def construir_inventario(rutas) -> List[str]:
+        """
+        Genera la lista de endpoints a partir de las rutas registradas en la
+        aplicación y deja serializado el cuerpo de /health (sin el timestamp).
+        """
+        endpoints = []
+        for ruta in rutas:
+            metodos = sorted(getattr(ruta, "methods", None) or [])
+            for metodo in metodos:
+                if metodo == "HEAD":
+                    continue
+                descripcion = getattr(ruta, "summary", None) or _primera_linea(getattr(ruta, "endpoint", None))
+                linea = f"{metodo} {ruta.path}"
+                endpoints.append(f"{linea} - {descripcion}" if descripcion else linea)
+
+        cuerpo = json.dumps({"status": "healthy", "endpoints": endpoints}, ensure_ascii=False, separators=(",", ":"))
+        # Se quita la llave de cierre para anexar el timestamp en cada petición
+        SistemaEndPoint.health_prefijo = (cuerpo[:-1] + ',"timestamp":').encode("utf-8")
+        SistemaEndPoint.rutas_inventariadas = len(rutas)
+        return endpoints
+
     @sistema_router.get("/health", 
                        response_model=HealthResponse,
                        summary="Health Check",
                        description="Endpoint de estado del servidor y lista de endpoints disponibles")
-    async def health_check():
+    async def health_check(request: Request):
         """GET /health - Health check endpoint"""
-        return HealthResponse(
-            status="healthy",
-            timestamp=time.time(),
-            endpoints=[
-                "GET /users - Lista usuarios con paginación",
-                "GET /users/{id} - Usuario específico",
-                "POST /users - Crear usuario",
-                "PUT /users/{id} - Actualizar usuario", 
-                "DELETE /users/{id} - Eliminar usuario",
-                "POST /autenticacion/login - Login con form data",
-                "GET /autenticacion/secure - Headers personalizados",
-                "GET /autenticacion/bearer - Autenticación Bearer",
-                "GET /autenticacion/basic-auth - Autenticación básica",
-                "GET /testing/slow?delay=N - Endpoint lento",
-                "GET /testing/error/{status} - Generar errores",
-                "GET /testing/random-error - Error aleatorio",
-                "GET /docs - Documentación Swagger UI",
-                "GET /redoc - Documentación ReDoc"
-            ]
+        # Solo se reconstruye si cambiaron las rutas (routers registrados de forma perezosa)
+        if len(request.app.routes) != SistemaEndPoint.rutas_inventariadas:
+            SistemaEndPoint.construir_inventario(request.app.routes)
+
+        return Response(
+            content=SistemaEndPoint.health_prefijo + repr(time.time()).encode("ascii") + b"}",
+            media_type="application/json"
         )
 
+    @sistema_router.get("/health/live",
+                       summary="Liveness probe",
+                       description="Responde siempre 200 mientras el proceso atienda peticiones")
+    async def liveness():
+        """GET /health/live - Sonda de vida (sin trabajo adicional)"""
+        return Response(content=SistemaEndPoint.LIVE_BYTES, media_type="application/json")
+
+    @sistema_router.get("/health/ready",
+                       summary="Readiness probe",
+                       description="Responde 200 si el almacén de usuarios está disponible, 503 si no")
+    async def readiness():
+        """GET /health/ready - Sonda de disponibilidad"""
+        repositorio = UsuariosEndPoint.repositorio
+        if not await en_repositorio(repositorio.disponible):
+            return Response(
+                content=b'{"status":"unavailable"}',
+                status_code=503,
+                media_type="application/json"
+            )
+
+        return Response(content=SistemaEndPoint.READY_BYTES, media_type="application/json")
+
+    @sistema_router.get("/metrics",
+                       summary="Métricas del servidor",
+                       description="Conteo de peticiones, status, peticiones en curso, histogramas "
+                                   "de latencia por ruta y estado de la caché de páginas de usuarios "
+                                   "(format=prometheus o format=json)")
+    async def metrics(format: str = "prometheus"):
+        """GET /metrics - Métricas de peticiones (de todos los workers con MOCK_API_DIR_METRICAS)"""
+        if format not in ("prometheus", "json"):
+            raise HTTPException(status_code=400, detail="format debe ser 'prometheus' o 'json'")
+
+        entre_workers = metricas_entre_workers()
+        if entre_workers is None:
+            registro, pid = registro_metricas, os.getpid()
+            estadisticas_cache = UsuariosEndPoint.cache_paginas.estadisticas()
+        else:
+            registro, instantaneas = entre_workers.agregar()
+            pid = None
+            estadisticas_cache = sumar_estadisticas([
+                instantanea["fuentes"]["users_page_cache"] for instantanea in instantaneas
+                if "users_page_cache" in instantanea["fuentes"]
+            ])
+
+        if format == "prometheus":
+            return Response(
+                content=registro.como_prometheus() + estadisticas_como_prometheus(estadisticas_cache, pid),
+                media_type="text/plain; version=0.0.4; charset=utf-8"
+            )
+        metricas = registro.como_dict()
+        metricas["users_page_cache"] = estadisticas_cache
+        return Response(content=json.dumps(metricas).encode("utf-8"), media_type="application/json")
+
+    @sistema_router.get("/profiles/{perfil_id}",
+                       summary="Perfil de una petición",
+                       description="Perfil cProfile guardado por una petición con X-Debug-Profile "
+                                   "(format=text para el resumen, format=prof para el archivo pstats). "
+                                   "Requiere el mismo header X-Debug-Profile")
+    async def profile(perfil_id: str, format: str = "text",
+                      x_debug_profile: Optional[str] = Header(None)):
+        """GET /profiles/{id} - Perfil guardado de una petición"""
+        if not token_valido(x_debug_profile):
+            raise HTTPException(status_code=403, detail="Invalid or missing X-Debug-Profile token")
+        ruta = os.path.join(directorio_perfiles(), f"{perfil_id}.prof")
+        if not re.fullmatch(r"[0-9a-f]{32}", perfil_id) or not os.path.exists(ruta):
+            raise HTTPException(status_code=404, detail="Profile not found")
+
+        if format == "prof":
+            return FileResponse(ruta, media_type="application/octet-stream", filename=f"{perfil_id}.prof")
+        if format == "text":
+            salida = io.StringIO()
+            pstats.Stats(ruta, stream=salida).sort_stats("cumulative").print_stats(40)
+            return PlainTextResponse(salida.getvalue())
+
+        raise HTTPException(status_code=400, detail="format debe ser 'text' o 'prof'")
+
     @sistema_router.get("/", 
                        summary="Página de inicio",
                        description="Información básica del API")
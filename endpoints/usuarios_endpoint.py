@@ -2,9 +2,39 @@
 Endpoints para la gestión de usuarios
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, TypeVar
+
+from almacenamiento.cache_paginas import crear_cache_paginas
+from almacenamiento.feed_cambios import FeedCambios
+from almacenamiento.usuarios_repositorio import VersionNoCoincide, crear_repositorio
+from middleware.metricas_middleware import registro_metricas
+from utilidades.condicional import (
+    coincide_if_none_match,
+    etag_pagina,
+    etag_usuario,
+    no_modificado,
+    precondicion_fallida,
+    versiones_if_match,
+)
+from utilidades.serializacion import codificar, respuesta_json
+
+
+T = TypeVar("T")
+
+
+async def en_repositorio(operacion: Callable[..., T], *args) -> T:
+    """
+    Ejecuta una operación (método ligado) del repositorio. Las de SQLite
+    bloquean, así que corren en el threadpool para no detener el event loop;
+    las del almacén en memoria se llaman directamente.
+    """
+    if operacion.__self__.BLOQUEANTE:
+        return await run_in_threadpool(operacion, *args)
+    return operacion(*args)
 
 
 # Esquemas de datos
@@ -22,38 +52,99 @@ class UsuariosEndPoint:
     
     usuarios_router = APIRouter()
     
-    # Datos de ejemplo (simulando una base de datos)
-    users_db = [
-        {"id": 1, "name": "Juan Pérez", "email": "juan@example.com"},
-        {"id": 2, "name": "María García", "email": "maria@example.com"},
-        {"id": 3, "name": "Carlos López", "email": "carlos@example.com"}
-    ]
+    # Almacén de usuarios (simulando una base de datos). En memoria por defecto;
+    # con varios workers se comparte vía SQLite (ver MOCK_API_ALMACEN)
+    repositorio = crear_repositorio()
+    
+    # Cuerpos codificados de GET /users (ver MOCK_API_CACHE_PAGINAS)
+    cache_paginas = crear_cache_paginas()
+    
+    # Eventos de creación/actualización/eliminación para GET /users/changes
+    feed_cambios = FeedCambios()
     
     @usuarios_router.get("/", 
                         response_model=Dict[str, Any],
                         summary="Obtener lista de usuarios",
-                        description="Obtiene la lista de usuarios con paginación opcional")
-    async def get_users(page: int = 1, limit: int = 10):
+                        description="Obtiene la lista de usuarios con paginación opcional. "
+                                    "Soporta If-None-Match (304 si la página no cambió)")
+    async def get_users(response: Response, page: int = 1, limit: int = 10,
+                        if_none_match: Optional[str] = Header(None)):
         """GET /users - Obtener usuarios con paginación"""
         start = (page - 1) * limit
         end = start + limit
         
-        return {
-            "users": UsuariosEndPoint.users_db[start:end],
-            "page": page,
-            "limit": limit,
-            "total": len(UsuariosEndPoint.users_db)
-        }
+        repositorio = UsuariosEndPoint.repositorio
+        cache = UsuariosEndPoint.cache_paginas
+        if not cache.activa:
+            users, total, version = await en_repositorio(repositorio.pagina, start, end)
+            etag = etag_pagina(repositorio.epoca, version, page, limit)
+            if coincide_if_none_match(if_none_match, etag):
+                return no_modificado(etag)
+            
+            response.headers["ETag"] = etag
+            return respuesta_json({
+                "users": users,
+                "page": page,
+                "limit": limit,
+                "total": total
+            }, response)
+        
+        # Con caché: la época y la versión de la colección bastan para el ETag y la clave,
+        # así que un 304 o un acierto no leen la página del almacén
+        version = await en_repositorio(repositorio.version_coleccion)
+        etag = etag_pagina(repositorio.epoca, version, page, limit)
+        if coincide_if_none_match(if_none_match, etag):
+            return no_modificado(etag)
+        
+        cuerpo = cache.obtener((repositorio.epoca, page, limit, version))
+        if cuerpo is None:
+            users, total, version_leida = await en_repositorio(repositorio.pagina, start, end)
+            if version_leida != version:
+                # Otro worker escribió entre ambas lecturas
+                version = version_leida
+                etag = etag_pagina(repositorio.epoca, version, page, limit)
+            cuerpo = codificar({
+                "users": users,
+                "page": page,
+                "limit": limit,
+                "total": total
+            })
+            cache.guardar((repositorio.epoca, page, limit, version), cuerpo)
+        
+        return Response(content=cuerpo, media_type="application/json", headers={"ETag": etag})
+
+    # Declarada antes de /{user_id} para que "changes" no se tome como un ID
+    @usuarios_router.get("/changes",
+                        response_class=StreamingResponse,
+                        summary="Feed de cambios de usuarios",
+                        description="Server-Sent Events con cada creación, actualización y eliminación. "
+                                    "Con Last-Event-ID se reanuda desde el último evento recibido")
+    async def changes(last_event_id: Optional[str] = Header(None)):
+        """GET /users/changes - Stream SSE de cambios"""
+        # Un ID inválido o de otro proceso se traduce en un evento reset
+        feed = UsuariosEndPoint.feed_cambios
+        return StreamingResponse(
+            feed.suscribir(feed.seq_desde_id(last_event_id)),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
 
     @usuarios_router.get("/{user_id}", 
                         response_model=Dict[str, Any],
                         summary="Obtener usuario específico",
-                        description="Obtiene un usuario por su ID")
-    async def get_user(user_id: int):
+                        description="Obtiene un usuario por su ID. "
+                                    "Soporta If-None-Match (304 si el usuario no cambió)")
+    async def get_user(user_id: int, response: Response, if_none_match: Optional[str] = Header(None)):
         """GET /users/{id} - Obtener usuario específico"""
-        user = next((u for u in UsuariosEndPoint.users_db if u["id"] == user_id), None)
+        repositorio = UsuariosEndPoint.repositorio
+        user, version = await en_repositorio(repositorio.obtener_con_version, user_id)
         if user:
-            return user
+            etag = etag_usuario(repositorio.epoca, user_id, version)
+            if coincide_if_none_match(if_none_match, etag):
+                return no_modificado(etag)
+            
+            response.headers["ETag"] = etag
+            return respuesta_json(user, response)
         
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -64,42 +155,65 @@ class UsuariosEndPoint:
                          description="Crea un nuevo usuario con los datos proporcionados")
     async def create_user(user: User):
         """POST /users - Crear nuevo usuario"""
-        new_user = {
-            "id": len(UsuariosEndPoint.users_db) + 1,
-            "name": user.name,
-            "email": user.email
-        }
-        UsuariosEndPoint.users_db.append(new_user)
+        repositorio = UsuariosEndPoint.repositorio
+        new_user = await en_repositorio(repositorio.crear, user.name, user.email)
+        UsuariosEndPoint.cache_paginas.invalidar()
+        UsuariosEndPoint.feed_cambios.publicar("created", new_user)
         
         return new_user
 
     @usuarios_router.put("/{user_id}", 
                         response_model=Dict[str, Any],
                         summary="Actualizar usuario",
-                        description="Actualiza los datos de un usuario existente")
-    async def update_user(user_id: int, user_update: UserUpdate):
+                        description="Actualiza los datos de un usuario existente. "
+                                    "Con If-Match solo actualiza si el ETag coincide (412 si no)")
+    async def update_user(user_id: int, user_update: UserUpdate, response: Response,
+                          if_match: Optional[str] = Header(None)):
         """PUT /users/{id} - Actualizar usuario"""
-        user = next((u for u in UsuariosEndPoint.users_db if u["id"] == user_id), None)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
         # Actualizar solo los campos proporcionados
+        cambios = {}
         if user_update.name is not None:
-            user["name"] = user_update.name
+            cambios["name"] = user_update.name
         if user_update.email is not None:
-            user["email"] = user_update.email
+            cambios["email"] = user_update.email
+        
+        repositorio = UsuariosEndPoint.repositorio
+        try:
+            user, version = await en_repositorio(
+                repositorio.actualizar, user_id, cambios, versiones_if_match(if_match, repositorio.epoca, user_id)
+            )
+        except VersionNoCoincide as error:
+            raise precondicion_fallida(etag_usuario(repositorio.epoca, user_id, error.version_actual))
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        UsuariosEndPoint.cache_paginas.invalidar()
+        UsuariosEndPoint.feed_cambios.publicar("updated", user)
         
+        response.headers["ETag"] = etag_usuario(repositorio.epoca, user_id, version)
         return user
 
     @usuarios_router.delete("/{user_id}", 
                            status_code=204,
                            summary="Eliminar usuario",
-                           description="Elimina un usuario por su ID")
-    async def delete_user(user_id: int):
+                           description="Elimina un usuario por su ID. "
+                                       "Con If-Match solo elimina si el ETag coincide (412 si no)")
+    async def delete_user(user_id: int, if_match: Optional[str] = Header(None)):
         """DELETE /users/{id} - Eliminar usuario"""
-        user = next((u for u in UsuariosEndPoint.users_db if u["id"] == user_id), None)
-        if not user:
+        repositorio = UsuariosEndPoint.repositorio
+        try:
+            eliminado = await en_repositorio(
+                repositorio.eliminar, user_id, versiones_if_match(if_match, repositorio.epoca, user_id)
+            )
+        except VersionNoCoincide as error:
+            raise precondicion_fallida(etag_usuario(repositorio.epoca, user_id, error.version_actual))
+        if not eliminado:
             raise HTTPException(status_code=404, detail="User not found")
+        UsuariosEndPoint.cache_paginas.invalidar()
+        UsuariosEndPoint.feed_cambios.publicar("deleted", {"id": user_id})
         
-        UsuariosEndPoint.users_db = [u for u in UsuariosEndPoint.users_db if u["id"] != user_id]
         return  # 204 No Content
+
+
+# Las estadísticas de la caché viajan con las instantáneas de métricas de
+# cada worker, para que /sistema/metrics pueda sumarlas (ver MetricasEntreWorkers)
+registro_metricas.fuentes["users_page_cache"] = lambda: UsuariosEndPoint.cache_paginas.estadisticas()
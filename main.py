@@ -15,7 +15,10 @@ Para ejecutar:
 
 import requests
 import base64
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import Future
 from typing import Dict, Any, Optional, Tuple
 
 
@@ -34,6 +37,186 @@ VALID_CREDENTIALS = {
 VALID_TOKENS = ["abc123token", "token456", "secrettoken"]
 
 
+# =============================================================================
+# 🧰 UTILIDADES DE CLIENTE
+# =============================================================================
+
+# Objetos ``auth`` cuyas credenciales se pueden comparar (los de requests que
+# solo usan usuario y contraseña). Con cualquier otro objeto no se sabe qué
+# headers va a aplicar, así que esas peticiones no reutilizan respuestas.
+_AUTH_IDENTIFICABLES = (requests.auth.HTTPBasicAuth, requests.auth.HTTPDigestAuth)
+
+
+def _clave_peticion(metodo: str, url: str, params: Any, headers: Optional[Dict[str, str]],
+                    auth: Any) -> Optional[Tuple[Any, ...]]:
+    """
+    Clave para reutilizar la respuesta de una petición entre llamadas, o None
+    si la identidad de autenticación no se puede determinar.
+
+    La URL es la que enviaría requests (``params`` ya codificados, sea un
+    dict, una lista de tuplas o con valores lista) y los headers incluyen
+    Authorization, así que usuarios distintos no comparten claves.
+    """
+    if auth is None or isinstance(auth, tuple):
+        identidad = auth
+    elif type(auth) in _AUTH_IDENTIFICABLES:
+        identidad = (type(auth).__name__, auth.username, auth.password)
+    else:
+        return None
+
+    url_preparada = requests.Request(metodo, url, params=params).prepare().url
+    cabeceras = tuple(sorted(((k.lower(), v) for k, v in (headers or {}).items()), key=lambda cabecera: cabecera[0]))
+    return (metodo, url_preparada, identidad, cabeceras)
+
+
+class CacheValidadores:
+    """
+    Caché pequeña (LRU) de respuestas GET junto con su ETag.
+
+    Al repetir un GET se envía If-None-Match con el ETag guardado; si el
+    servidor responde 304 se retorna la respuesta guardada, sin volver a
+    transferir ni decodificar el cuerpo.
+
+    Uso:
+        cache = CacheValidadores()
+        response = cache.get(f"{BASE_URL}/users/1")
+        response = cache.get(f"{BASE_URL}/users/1")  # 304 en el servidor, 200 aquí
+    """
+
+    def __init__(self, capacidad: int = 128, sesion: Optional[requests.Session] = None):
+        self.capacidad = capacidad
+        self.sesion = sesion or requests.Session()
+        self.aciertos = 0  # Respuestas 304 servidas desde la caché
+        self.fallos = 0
+        self._entradas: "OrderedDict[Tuple[Any, ...], Tuple[str, requests.Response]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url: str, params: Any = None,
+            headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        clave = _clave_peticion("GET", url, params, headers, kwargs.get("auth"))
+        if clave is None:
+            return self.sesion.get(url, params=params, headers=headers, **kwargs)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+
+        headers = dict(headers or {})
+        if entrada is not None:
+            headers["If-None-Match"] = entrada[0]
+
+        response = self.sesion.get(url, params=params, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entrada is not None:
+            with self._lock:
+                self.aciertos += 1
+                if clave in self._entradas:
+                    self._entradas.move_to_end(clave)
+            return entrada[1]
+
+        with self._lock:
+            self.fallos += 1
+            etag = response.headers.get("ETag")
+            if response.status_code == 200 and etag:
+                self._entradas[clave] = (etag, response)
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.capacidad:
+                    self._entradas.popitem(last=False)
+            else:
+                self._entradas.pop(clave, None)
+        return response
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+class AgrupadorPeticiones:
+    """
+    Agrupa GETs idénticos concurrentes en una sola petición HTTP (single-flight).
+
+    Si varios hilos piden el mismo GET (mismo método, URL, parámetros,
+    headers e identidad de autenticación) mientras el primero sigue en
+    curso, todos esperan y reciben esa misma respuesta. Con ``ttl`` > 0 la
+    respuesta se reutiliza además durante ``ttl`` segundos (micro-caché).
+
+    Los métodos no idempotentes, las peticiones con ``stream=True`` y las que
+    usan un objeto ``auth`` personalizado se envían siempre tal cual.
+
+    Uso:
+        agrupador = AgrupadorPeticiones(ttl=0.5)
+        response = agrupador.get(f"{BASE_URL}/users/1")
+        print(agrupador.ahorradas)
+    """
+
+    METODOS_AGRUPABLES = ("GET", "HEAD")
+
+    def __init__(self, sesion: Optional[requests.Session] = None, ttl: float = 0.0, capacidad: int = 256):
+        self.sesion = sesion or requests.Session()
+        self.ttl = ttl
+        self.capacidad = capacidad
+        self.enviadas = 0   # Peticiones HTTP realmente enviadas
+        self.agrupadas = 0  # Peticiones que esperaron a otra idéntica en curso
+        self.cacheadas = 0  # Peticiones servidas desde la micro-caché
+        self._en_curso: Dict[Tuple[Any, ...], Future] = {}
+        self._cache: "OrderedDict[Tuple[Any, ...], Tuple[float, requests.Response]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ahorradas(self) -> int:
+        return self.agrupadas + self.cacheadas
+
+    def get(self, url: str, params: Any = None, **kwargs) -> requests.Response:
+        return self.request("GET", url, params=params, **kwargs)
+
+    def request(self, metodo: str, url: str, params: Any = None,
+                headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        metodo = metodo.upper()
+        clave = None
+        if metodo in self.METODOS_AGRUPABLES and not kwargs.get("stream"):
+            clave = _clave_peticion(metodo, url, params, headers, kwargs.get("auth"))
+        if clave is None:
+            with self._lock:
+                self.enviadas += 1
+            return self.sesion.request(metodo, url, params=params, headers=headers, **kwargs)
+
+        with self._lock:
+            entrada = self._cache.get(clave)
+            if entrada is not None and entrada[0] > time.monotonic():
+                self.cacheadas += 1
+                return entrada[1]
+            futuro = self._en_curso.get(clave)
+            lider = futuro is None
+            if lider:
+                futuro = self._en_curso[clave] = Future()
+                self.enviadas += 1
+            else:
+                self.agrupadas += 1
+
+        if not lider:
+            return futuro.result()
+
+        try:
+            response = self.sesion.request(metodo, url, params=params, headers=headers, **kwargs)
+        except BaseException as error:
+            with self._lock:
+                del self._en_curso[clave]
+            futuro.set_exception(error)
+            raise
+
+        with self._lock:
+            del self._en_curso[clave]
+            if self.ttl > 0 and response.status_code < 500:
+                self._cache[clave] = (time.monotonic() + self.ttl, response)
+                self._cache.move_to_end(clave)
+                while len(self._cache) > self.capacidad:
+                    self._cache.popitem(last=False)
+        futuro.set_result(response)
+        return response
+
+    def limpiar(self):
+        with self._lock:
+            self._cache.clear()
+
+
 # =============================================================================
 # 🧑‍💼 CASOS DE PRUEBA - USUARIOS
 # =============================================================================
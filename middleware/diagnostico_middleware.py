@@ -0,0 +1,193 @@
+"""
+Middleware ASGI de diagnóstico: Server-Timing y perfil bajo demanda
+===================================================================
+
+Server-Timing (MOCK_API_SERVER_TIMING=1)
+    Cada respuesta lleva un header ``Server-Timing`` con la duración en ms de
+    cada fase de la petición:
+
+    - ``route``: middlewares, enrutado y lectura del cuerpo
+    - ``deps``: resolución de dependencias (p. ej. ``verify_basic_auth``) y
+      validación de parámetros y cuerpo con Pydantic
+    - ``handler``: el cuerpo del endpoint
+    - ``serialize``: validación contra ``response_model`` y conversión a JSON
+    - ``total``: hasta que se envían los headers de la respuesta
+
+    Las fases se miden envolviendo las funciones de ``fastapi.routing`` que
+    las ejecutan; el envoltorio solo se instala si Server-Timing está activo.
+
+Perfil bajo demanda (MOCK_API_TOKEN_PERFIL=<token>)
+    Una petición con ``X-Debug-Profile: <token>`` se ejecuta bajo cProfile. El
+    perfil se guarda en MOCK_API_DIR_PERFILES y su ID vuelve en el header
+    ``X-Debug-Profile-Id``; se consulta en ``/sistema/profiles/{id}`` con el
+    mismo header. Solo se perfila una petición a la vez, y como cProfile mide
+    el hilo completo el perfil incluye a las demás peticiones atendidas
+    mientras tanto por el event loop. Se conservan los últimos
+    MOCK_API_MAX_PERFILES archivos (20 por defecto); los más viejos se borran.
+
+Sin ninguna de las dos variables el middleware no se agrega a la app.
+"""
+
+import cProfile
+import glob
+import hmac
+import inspect
+import os
+import tempfile
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import fastapi
+import fastapi.routing
+
+
+CABECERA_PERFIL = "x-debug-profile"
+
+# Fases de la petición en curso (None si no se está midiendo)
+_fases: ContextVar[Optional[Dict[str, int]]] = ContextVar("fases_peticion", default=None)
+
+_instalado = False
+
+# Funciones de ``fastapi.routing`` que ejecutan cada fase. Es un detalle
+# interno de FastAPI, verificado con la versión fijada en requirements.txt
+# (fastapi==0.104.1): el handler que arma ``get_request_handler()`` las busca
+# por nombre en el módulo en cada petición, así que reemplazarlas ahí basta.
+# Al actualizar FastAPI hay que revisar que sigan existiendo con ese rol;
+# instalar_medicion_fases() falla al arrancar si ya no son corrutinas.
+FUNCIONES_POR_FASE = (
+    ("deps", "solve_dependencies"),
+    ("handler", "run_endpoint_function"),
+    ("serialize", "serialize_response"),
+)
+
+MAX_PERFILES_POR_DEFECTO = 20
+
+
+def directorio_perfiles() -> str:
+    return os.environ.get("MOCK_API_DIR_PERFILES") or os.path.join(tempfile.gettempdir(), "mock_api_perfiles")
+
+
+def max_perfiles() -> int:
+    return int(os.environ.get("MOCK_API_MAX_PERFILES", MAX_PERFILES_POR_DEFECTO))
+
+
+def rotar_perfiles(directorio: str, maximo: int):
+    """Borra los perfiles más viejos hasta dejar ``maximo``"""
+    perfiles = sorted(glob.glob(os.path.join(directorio, "*.prof")), key=os.path.getmtime)
+    for ruta in perfiles[:max(len(perfiles) - maximo, 0)]:
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass  # Otro worker lo borró primero
+
+
+def token_valido(token: Optional[str]) -> bool:
+    """True si ``token`` coincide con MOCK_API_TOKEN_PERFIL (comparación en tiempo constante)"""
+    esperado = os.environ.get("MOCK_API_TOKEN_PERFIL")
+    return bool(esperado) and token is not None and hmac.compare_digest(token.encode(), esperado.encode())
+
+
+def _medir(fase: str, funcion):
+    async def medida(*args, **kwargs):
+        fases = _fases.get()
+        if fases is None:
+            return await funcion(*args, **kwargs)
+        inicio = time.perf_counter_ns()
+        fases.setdefault(f"_{fase}_inicio", inicio)
+        try:
+            return await funcion(*args, **kwargs)
+        finally:
+            fases[fase] = fases.get(fase, 0) + time.perf_counter_ns() - inicio
+
+    medida.__wrapped__ = funcion
+    return medida
+
+
+def instalar_medicion_fases():
+    """Envuelve las funciones de FastAPI que ejecutan cada fase (una sola vez)"""
+    global _instalado
+    if _instalado:
+        return
+    # Se valida todo antes de reemplazar nada: o se miden las tres fases o ninguna
+    for _, nombre in FUNCIONES_POR_FASE:
+        if not inspect.iscoroutinefunction(getattr(fastapi.routing, nombre, None)):
+            raise RuntimeError(
+                f"Server-Timing no es compatible con fastapi {fastapi.__version__}: "
+                f"fastapi.routing.{nombre} no existe o no es una corrutina (probado con 0.104.1)"
+            )
+    for fase, nombre in FUNCIONES_POR_FASE:
+        setattr(fastapi.routing, nombre, _medir(fase, getattr(fastapi.routing, nombre)))
+    _instalado = True
+
+
+def server_timing(fases: Dict[str, int], inicio: int, fin: int) -> bytes:
+    """Valor del header Server-Timing con las duraciones en milisegundos"""
+    entradas = []
+    if "_deps_inicio" in fases:
+        entradas.append(("route", fases["_deps_inicio"] - inicio))
+    entradas += [(fase, fases[fase]) for fase in ("deps", "handler", "serialize") if fase in fases]
+    entradas.append(("total", fin - inicio))
+    return ", ".join(f"{fase};dur={duracion / 1e6:.3f}" for fase, duracion in entradas).encode("latin-1")
+
+
+class DiagnosticoMiddleware:
+    """Agrega Server-Timing y perfila la petición si trae el header de depuración"""
+
+    def __init__(self, app, server_timing: bool = True, perfiles: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+        self.perfiles = perfiles
+        self._perfilando = False
+        if server_timing:
+            instalar_medicion_fases()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        perfil = None
+        if self.perfiles and not self._perfilando:
+            token = next((valor for nombre, valor in scope["headers"] if nombre == CABECERA_PERFIL.encode()), None)
+            if token is not None and token_valido(token.decode("latin-1")):
+                perfil = cProfile.Profile()
+                perfil_id = uuid.uuid4().hex
+
+        if not self.server_timing and perfil is None:
+            await self.app(scope, receive, send)
+            return
+
+        fases: Dict[str, int] = {}
+        marca = _fases.set(fases) if self.server_timing else None
+        inicio = time.perf_counter_ns()
+
+        async def send_con_diagnostico(mensaje):
+            if mensaje["type"] == "http.response.start":
+                cabeceras = list(mensaje.get("headers", []))
+                if self.server_timing:
+                    cabeceras.append((b"server-timing", server_timing(fases, inicio, time.perf_counter_ns())))
+                if perfil is not None:
+                    cabeceras.append((b"x-debug-profile-id", perfil_id.encode("ascii")))
+                mensaje = {**mensaje, "headers": cabeceras}
+            await send(mensaje)
+
+        try:
+            if perfil is None:
+                await self.app(scope, receive, send_con_diagnostico)
+                return
+            self._perfilando = True
+            perfil.enable()
+            try:
+                await self.app(scope, receive, send_con_diagnostico)
+            finally:
+                perfil.disable()
+                self._perfilando = False
+                directorio = directorio_perfiles()
+                os.makedirs(directorio, exist_ok=True)
+                perfil.dump_stats(os.path.join(directorio, f"{perfil_id}.prof"))
+                rotar_perfiles(directorio, max_perfiles())
+        finally:
+            if marca is not None:
+                _fases.reset(marca)
@@ -0,0 +1,195 @@
+"""
+Middleware ASGI para grabar el tráfico en un archivo JSONL
+"""
+
+import base64
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+
+# Bytes máximos que se guardan de cada cuerpo (petición o respuesta)
+MAX_CUERPO_GRABADO = 64 * 1024
+
+# Registros máximos por escritura en disco
+TAMANO_LOTE = 512
+
+# Registros máximos esperando al hilo escritor; si el disco no da abasto (o
+# falla) los siguientes se descartan en lugar de acumularse en memoria
+MAX_PENDIENTES = 10_000
+
+_FIN = object()
+
+logger = logging.getLogger(__name__)
+
+
+def _cuerpo_a_json(cuerpo: bytes) -> Dict[str, Any]:
+    """Representación JSON de un cuerpo: texto si es UTF-8, base64 si no"""
+    truncado = len(cuerpo) > MAX_CUERPO_GRABADO
+    cuerpo = cuerpo[:MAX_CUERPO_GRABADO]
+    try:
+        datos = {"text": cuerpo.decode("utf-8")}
+    except UnicodeDecodeError:
+        datos = {"base64": base64.b64encode(cuerpo).decode("ascii")}
+    if truncado:
+        datos["truncated"] = True
+    return datos
+
+
+def _cabeceras_a_json(cabeceras: List[Tuple[bytes, bytes]]) -> Dict[str, str]:
+    return {nombre.decode("latin-1"): valor.decode("latin-1") for nombre, valor in cabeceras}
+
+
+def _registro_a_json(registro: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte los campos crudos (bytes, cabeceras ASGI) de un registro a JSON"""
+    return {
+        **registro,
+        "headers": _cabeceras_a_json(registro["headers"]),
+        "body": _cuerpo_a_json(registro["body"]),
+        "response_headers": _cabeceras_a_json(registro["response_headers"]),
+        "response_body": _cuerpo_a_json(registro["response_body"]),
+    }
+
+
+class GrabadorTrafico:
+    """
+    Escritor en segundo plano de registros JSONL.
+
+    ``registrar()`` solo encola el registro tal como llega (cuerpos en bytes,
+    cabeceras ASGI); un hilo aparte lo convierte a JSON y lo escribe en
+    lotes, así que el event loop nunca espera al disco ni serializa. Cada
+    lote se escribe sobre un descriptor abierto con ``O_APPEND``, por lo que
+    varios workers pueden grabar en el mismo archivo sin intercalar líneas.
+
+    La cola está acotada: con ella llena ``registrar()`` descarta el registro
+    y lo cuenta en ``descartados``. Un error al convertir o escribir un lote
+    se registra en el log y cuenta sus registros en ``fallidos``; el hilo
+    sigue con el lote siguiente.
+    """
+
+    def __init__(self, ruta: str, intervalo_flush: float = 0.5, max_pendientes: int = MAX_PENDIENTES):
+        self.ruta = ruta
+        self.intervalo_flush = intervalo_flush
+        self.grabados = 0
+        self.descartados = 0
+        self.fallidos = 0
+        self._cola: "queue.Queue[Any]" = queue.Queue(maxsize=max_pendientes)
+        self._descriptor = os.open(ruta, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._hilo = threading.Thread(target=self._escribir, name="grabador-trafico", daemon=True)
+        self._hilo.start()
+
+    def registrar(self, registro: Dict[str, Any]):
+        try:
+            self._cola.put_nowait(registro)
+        except queue.Full:
+            self.descartados += 1
+
+    def cerrar(self):
+        """Escribe lo pendiente y libera el archivo"""
+        if self._hilo.is_alive():
+            self._cola.put(_FIN)
+            self._hilo.join()
+        os.close(self._descriptor)
+
+    def _escribir(self):
+        terminar = False
+        while not terminar:
+            try:
+                lote = [self._cola.get(timeout=self.intervalo_flush)]
+            except queue.Empty:
+                continue
+            while len(lote) < TAMANO_LOTE:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+
+            if _FIN in lote:
+                terminar = True
+                lote = [registro for registro in lote if registro is not _FIN]
+            if lote:
+                try:
+                    self._escribir_lote(lote)
+                except Exception:
+                    # P. ej. disco lleno (ENOSPC): se pierde este lote, no el hilo
+                    self.fallidos += len(lote)
+                    logger.exception("No se pudieron grabar %d registros en %s", len(lote), self.ruta)
+
+    def _escribir_lote(self, lote: List[Dict[str, Any]]):
+        lineas = "".join(
+            json.dumps(_registro_a_json(registro), ensure_ascii=False) + "\n" for registro in lote
+        )
+        pendiente = memoryview(lineas.encode("utf-8"))
+        while pendiente:
+            pendiente = pendiente[os.write(self._descriptor, pendiente):]
+        self.grabados += len(lote)
+
+
+class GrabacionMiddleware:
+    """
+    Middleware ASGI que graba cada petición HTTP y su respuesta.
+
+    Cada línea del archivo contiene: ts, method, path, query, headers, body,
+    status, response_headers, response_body y latency_ms.
+
+    Las sub-peticiones de POST /batch (scope con ``batch``) no se graban:
+    el lote ya queda grabado y reproducirlo las vuelve a ejecutar.
+    """
+
+    def __init__(self, app, grabador: GrabadorTrafico):
+        self.app = app
+        self.grabador = grabador
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("batch"):
+            await self.app(scope, receive, send)
+            return
+
+        cuerpo_peticion: List[bytes] = []
+        cuerpo_respuesta: List[bytes] = []
+        respuesta: Dict[str, Any] = {"status": 500, "headers": [], "bytes": 0}
+        bytes_peticion = 0
+
+        async def receive_grabando():
+            nonlocal bytes_peticion
+            mensaje = await receive()
+            if mensaje["type"] == "http.request" and bytes_peticion <= MAX_CUERPO_GRABADO:
+                # Mismo tope que la respuesta: al grabar se trunca de todos modos
+                cuerpo = mensaje.get("body", b"")
+                cuerpo_peticion.append(cuerpo)
+                bytes_peticion += len(cuerpo)
+            return mensaje
+
+        async def send_grabando(mensaje):
+            if mensaje["type"] == "http.response.start":
+                respuesta["status"] = mensaje["status"]
+                respuesta["headers"] = mensaje.get("headers", [])
+            elif mensaje["type"] == "http.response.body" and respuesta["bytes"] <= MAX_CUERPO_GRABADO:
+                # Tope para respuestas largas (p. ej. /users/changes): el resto
+                # se descartaría al truncar de todos modos
+                cuerpo = mensaje.get("body", b"")
+                cuerpo_respuesta.append(cuerpo)
+                respuesta["bytes"] += len(cuerpo)
+            await send(mensaje)
+
+        ts = time.time()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive_grabando, send_grabando)
+        finally:
+            self.grabador.registrar({
+                "ts": ts,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "headers": scope.get("headers", []),
+                "body": b"".join(cuerpo_peticion),
+                "status": respuesta["status"],
+                "response_headers": respuesta["headers"],
+                "response_body": b"".join(cuerpo_respuesta),
+                "latency_ms": round((time.perf_counter() - inicio) * 1000, 3),
+            })
@@ -0,0 +1,377 @@
+"""
+Middleware ASGI para métricas de peticiones
+"""
+
+import asyncio
+import glob
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starlette.routing import Match
+
+
+# Límites de los buckets exportados en formato Prometheus (segundos)
+BUCKETS_PROMETHEUS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Ruta usada para peticiones que no coinciden con ningún endpoint (evita
+# que cada URL inexistente cree una serie nueva)
+RUTA_DESCONOCIDA = "<sin_ruta>"
+
+# Máximo de combinaciones (método, path) recordadas por el resolvedor de rutas
+MAX_CACHE_RUTAS = 4096
+
+# Segundos entre instantáneas de cada worker cuando se agregan entre workers
+INTERVALO_INSTANTANEA = 1.0
+
+
+class HistogramaLatencia:
+    """
+    Histograma estilo HDR con buckets log-lineales en microsegundos.
+
+    Los valores menores a 16 µs se guardan exactos; a partir de ahí cada
+    potencia de dos se divide en 8 sub-buckets (error relativo <= 12.5%).
+    Solo se guardan los buckets con datos, por lo que registrar un valor
+    cuesta un par de operaciones de bits y un incremento en un dict.
+    """
+
+    __slots__ = ("buckets", "count", "suma_us", "max_us")
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.suma_us = 0
+        self.max_us = 0
+
+    @staticmethod
+    def indice(valor_us: int) -> int:
+        magnitud = valor_us.bit_length()
+        if magnitud <= 4:
+            return valor_us
+        desplazamiento = magnitud - 4
+        return 16 + (desplazamiento - 1) * 8 + ((valor_us >> desplazamiento) & 0x7)
+
+    @staticmethod
+    def limite_superior(indice: int) -> int:
+        """Mayor valor (µs) que cae en el bucket ``indice``"""
+        if indice < 16:
+            return indice
+        desplazamiento = (indice - 16) // 8 + 1
+        sub_bucket = (indice - 16) % 8
+        return ((8 + sub_bucket + 1) << desplazamiento) - 1
+
+    def registrar(self, valor_us: int):
+        indice = self.indice(valor_us)
+        self.buckets[indice] = self.buckets.get(indice, 0) + 1
+        self.count += 1
+        self.suma_us += valor_us
+        if valor_us > self.max_us:
+            self.max_us = valor_us
+
+    def percentil(self, p: float) -> int:
+        """Valor aproximado (µs) del percentil ``p`` (0-100)"""
+        if not self.count:
+            return 0
+        objetivo = max(1, int(self.count * p / 100 + 0.5))
+        acumulado = 0
+        for indice in sorted(self.buckets):
+            acumulado += self.buckets[indice]
+            if acumulado >= objetivo:
+                return min(self.limite_superior(indice), self.max_us)
+        return self.max_us
+
+    def acumulado_por_limite(self, limites_s) -> List[int]:
+        """Cuentas acumuladas para cada límite ``le`` (en segundos)"""
+        limites_us = [limite * 1_000_000 for limite in limites_s]
+        cuentas = [0] * len(limites_us)
+        for indice, cantidad in self.buckets.items():
+            tope = self.limite_superior(indice)
+            for posicion, limite in enumerate(limites_us):
+                if tope <= limite:
+                    cuentas[posicion] += cantidad
+                    break
+        acumulado = 0
+        for posicion, cantidad in enumerate(cuentas):
+            acumulado += cantidad
+            cuentas[posicion] = acumulado
+        return cuentas
+
+
+class EstadisticasRuta:
+    """Contadores de una combinación (método, ruta)"""
+
+    __slots__ = ("en_curso", "status", "latencia")
+
+    def __init__(self):
+        self.en_curso = 0
+        self.status: Dict[int, int] = {}
+        self.latencia = HistogramaLatencia()
+
+
+class RegistroMetricas:
+    """
+    Registro de métricas por worker.
+
+    Todas las actualizaciones se hacen desde el event loop del worker, que es
+    de un solo hilo, así que no se necesitan locks. Por sí solo un registro
+    describe un único proceso (etiqueta ``pid``); con varios workers se
+    agregan con ``MetricasEntreWorkers``.
+    """
+
+    def __init__(self):
+        self.rutas: Dict[Tuple[str, str], EstadisticasRuta] = {}
+        self.inicio = time.time()
+        # PIDs sumados en este registro (None = solo el proceso actual)
+        self.workers: Optional[List[int]] = None
+        # Estadísticas de otros componentes que viajan en las instantáneas
+        # (p. ej. la caché de páginas de GET /users)
+        self.fuentes: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def estadisticas(self, metodo: str, ruta: str) -> EstadisticasRuta:
+        clave = (metodo, ruta)
+        estadisticas = self.rutas.get(clave)
+        if estadisticas is None:
+            estadisticas = self.rutas[clave] = EstadisticasRuta()
+        return estadisticas
+
+    def reiniciar(self):
+        self.rutas.clear()
+        self.inicio = time.time()
+
+    def instantanea(self, final: bool = False) -> Dict[str, Any]:
+        """Estado serializable en JSON (``final``: el proceso ya no atiende peticiones)"""
+        return {
+            "pid": _pid(),
+            "inicio": self.inicio,
+            "rutas": [
+                [metodo, ruta, 0 if final else estadisticas.en_curso, estadisticas.status,
+                 estadisticas.latencia.buckets, estadisticas.latencia.count,
+                 estadisticas.latencia.suma_us, estadisticas.latencia.max_us]
+                for (metodo, ruta), estadisticas in self.rutas.items()
+            ],
+            "fuentes": {nombre: fuente() for nombre, fuente in self.fuentes.items()},
+        }
+
+    def fusionar(self, instantanea: Dict[str, Any]):
+        """Suma una instantánea (de este u otro worker) a este registro"""
+        self.inicio = min(self.inicio, instantanea["inicio"])
+        for metodo, ruta, en_curso, status, buckets, count, suma_us, max_us in instantanea["rutas"]:
+            estadisticas = self.estadisticas(metodo, ruta)
+            estadisticas.en_curso += en_curso
+            for codigo, cantidad in status.items():
+                estadisticas.status[int(codigo)] = estadisticas.status.get(int(codigo), 0) + cantidad
+            latencia = estadisticas.latencia
+            for indice, cantidad in buckets.items():
+                latencia.buckets[int(indice)] = latencia.buckets.get(int(indice), 0) + cantidad
+            latencia.count += count
+            latencia.suma_us += suma_us
+            latencia.max_us = max(latencia.max_us, max_us)
+
+    def como_dict(self) -> Dict[str, Any]:
+        """Resumen en JSON con percentiles en milisegundos"""
+        rutas = []
+        for (metodo, ruta), estadisticas in sorted(self.rutas.items(), key=lambda item: (item[0][1], item[0][0])):
+            latencia = estadisticas.latencia
+            rutas.append({
+                "method": metodo,
+                "route": ruta,
+                "requests": latencia.count,
+                "in_flight": estadisticas.en_curso,
+                "status": {str(codigo): cantidad for codigo, cantidad in sorted(estadisticas.status.items())},
+                "latency_ms": {
+                    "mean": round(latencia.suma_us / latencia.count / 1000, 3) if latencia.count else 0.0,
+                    "p50": latencia.percentil(50) / 1000,
+                    "p90": latencia.percentil(90) / 1000,
+                    "p99": latencia.percentil(99) / 1000,
+                    "max": latencia.max_us / 1000,
+                },
+            })
+        resumen = {"pid": _pid(), "uptime_seconds": round(time.time() - self.inicio, 3), "routes": rutas}
+        if self.workers is not None:
+            resumen["workers"] = self.workers
+        return resumen
+
+    def como_prometheus(self) -> str:
+        """
+        Exposición en formato de texto de Prometheus (version 0.0.4). Un
+        registro agregado entre workers no lleva la etiqueta ``pid``.
+        """
+        etiqueta_pid = {"pid": _pid()} if self.workers is None else {}
+        lineas = [
+            "# HELP mock_api_http_requests_total Peticiones HTTP completadas.",
+            "# TYPE mock_api_http_requests_total counter",
+        ]
+        items = sorted(self.rutas.items(), key=lambda item: (item[0][1], item[0][0]))
+        for (metodo, ruta), estadisticas in items:
+            for codigo, cantidad in sorted(estadisticas.status.items()):
+                etiquetas = _etiquetas(**etiqueta_pid, method=metodo, route=ruta, status=codigo)
+                lineas.append(f"mock_api_http_requests_total{{{etiquetas}}} {cantidad}")
+
+        lineas += [
+            "# HELP mock_api_http_requests_in_flight Peticiones HTTP en curso.",
+            "# TYPE mock_api_http_requests_in_flight gauge",
+        ]
+        for (metodo, ruta), estadisticas in items:
+            etiquetas = _etiquetas(**etiqueta_pid, method=metodo, route=ruta)
+            lineas.append(f"mock_api_http_requests_in_flight{{{etiquetas}}} {estadisticas.en_curso}")
+
+        lineas += [
+            "# HELP mock_api_http_request_duration_seconds Latencia de las peticiones HTTP.",
+            "# TYPE mock_api_http_request_duration_seconds histogram",
+        ]
+        for (metodo, ruta), estadisticas in items:
+            latencia = estadisticas.latencia
+            etiquetas = _etiquetas(**etiqueta_pid, method=metodo, route=ruta)
+            acumulados = latencia.acumulado_por_limite(BUCKETS_PROMETHEUS)
+            for limite, acumulado in zip(BUCKETS_PROMETHEUS, acumulados):
+                lineas.append(f'mock_api_http_request_duration_seconds_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            lineas.append(f'mock_api_http_request_duration_seconds_bucket{{{etiquetas},le="+Inf"}} {latencia.count}')
+            lineas.append(f"mock_api_http_request_duration_seconds_sum{{{etiquetas}}} {latencia.suma_us / 1_000_000}")
+            lineas.append(f"mock_api_http_request_duration_seconds_count{{{etiquetas}}} {latencia.count}")
+
+        return "\n".join(lineas) + "\n"
+
+    def como_json(self) -> bytes:
+        return json.dumps(self.como_dict()).encode("utf-8")
+
+
+def _pid() -> int:
+    return os.getpid()
+
+
+def _escapar(valor: Any) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(**valores) -> str:
+    return ",".join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in valores.items())
+
+
+# Registro compartido por el middleware y el endpoint /sistema/metrics
+registro_metricas = RegistroMetricas()
+
+
+class MetricasEntreWorkers:
+    """
+    Agregación de las métricas de todos los workers, al estilo del modo
+    multiproceso de prometheus_client.
+
+    Con varios workers cada scrape de /sistema/metrics llega a uno cualquiera,
+    así que ninguno puede responder solo con sus contadores. Cada worker
+    escribe cada ``INTERVALO_INSTANTANEA`` segundos una instantánea de su
+    registro en ``<directorio>/<pid>.json`` (reemplazo atómico) y el que
+    atiende el scrape escribe la suya al momento y suma las de todos.
+
+    Las instantáneas de workers terminados se conservan para que los
+    contadores nunca retrocedan; la última que escribe un worker al apagarse
+    lleva sus peticiones en curso en 0. El directorio debe ser propio de
+    cada ejecución del servidor.
+    """
+
+    def __init__(self, directorio: str, registro: RegistroMetricas):
+        self.directorio = directorio
+        self.registro = registro
+
+    def escribir(self, final: bool = False):
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = os.path.join(self.directorio, f"{_pid()}.json")
+        with open(ruta + ".tmp", "w", encoding="utf-8") as archivo:
+            json.dump(self.registro.instantanea(final), archivo)
+        os.replace(ruta + ".tmp", ruta)
+
+    def agregar(self) -> Tuple[RegistroMetricas, List[Dict[str, Any]]]:
+        """Registro con la suma de todos los workers y las instantáneas leídas"""
+        self.escribir()
+        agregado = RegistroMetricas()
+        instantaneas = []
+        for ruta in sorted(glob.glob(os.path.join(self.directorio, "*.json"))):
+            try:
+                with open(ruta, encoding="utf-8") as archivo:
+                    instantaneas.append(json.load(archivo))
+            except (OSError, ValueError):
+                continue  # Worker que justo está escribiendo o archivo ajeno
+        for instantanea in instantaneas:
+            agregado.fusionar(instantanea)
+        agregado.workers = sorted(instantanea["pid"] for instantanea in instantaneas)
+        return agregado, instantaneas
+
+    async def publicar(self, intervalo: float = INTERVALO_INSTANTANEA):
+        """Escribe la instantánea de este worker cada ``intervalo`` segundos"""
+        while True:
+            await asyncio.sleep(intervalo)
+            self.escribir()
+
+
+def metricas_entre_workers() -> Optional[MetricasEntreWorkers]:
+    """Agregación configurada por MOCK_API_DIR_METRICAS (None si no se agrega)"""
+    directorio = os.environ.get("MOCK_API_DIR_METRICAS")
+    return MetricasEntreWorkers(directorio, registro_metricas) if directorio else None
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI puro que mide cada petición HTTP.
+
+    Registra por (método, ruta) el número de peticiones por status, las
+    peticiones en curso y un histograma de latencia. La ruta es la plantilla
+    del endpoint (``/users/{user_id}``), no el path concreto, para que la
+    cardinalidad de las series no crezca con los IDs.
+
+    Las sub-peticiones de POST /batch (scope con ``batch``) no se cuentan:
+    su tiempo ya forma parte del lote.
+    """
+
+    def __init__(self, app, registro: Optional[RegistroMetricas] = None):
+        self.app = app
+        self.registro = registro if registro is not None else registro_metricas
+        self._cache_rutas: Dict[Tuple[str, str], str] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("batch"):
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        estadisticas = self.registro.estadisticas(metodo, self._resolver_ruta(scope))
+        status_code = 500
+
+        async def send_con_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        estadisticas.en_curso += 1
+        inicio = time.perf_counter_ns()
+        try:
+            await self.app(scope, receive, send_con_status)
+        finally:
+            estadisticas.en_curso -= 1
+            estadisticas.latencia.registrar((time.perf_counter_ns() - inicio) // 1000)
+            estadisticas.status[status_code] = estadisticas.status.get(status_code, 0) + 1
+
+    def _resolver_ruta(self, scope) -> str:
+        """Plantilla de la ruta que atenderá la petición (con caché)"""
+        clave = (scope["method"], scope["path"])
+        ruta = self._cache_rutas.get(clave)
+        if ruta is not None:
+            return ruta
+
+        ruta = RUTA_DESCONOCIDA
+        aplicacion = scope.get("app")
+        for candidata in getattr(aplicacion, "routes", ()):
+            coincidencia, _ = candidata.matches(scope)
+            if coincidencia == Match.FULL:
+                ruta = getattr(candidata, "path", RUTA_DESCONOCIDA)
+                break
+            if coincidencia == Match.PARTIAL and ruta == RUTA_DESCONOCIDA:
+                ruta = getattr(candidata, "path", RUTA_DESCONOCIDA)
+
+        if len(self._cache_rutas) >= MAX_CACHE_RUTAS:
+            self._cache_rutas.clear()
+        self._cache_rutas[clave] = ruta
+        return ruta
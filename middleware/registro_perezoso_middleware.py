@@ -0,0 +1,60 @@
+"""
+Registro perezoso de routers
+"""
+
+import importlib
+from typing import List, Tuple
+
+
+# (módulo, clase, atributo del router, prefijo, tag)
+EspecificacionRouter = Tuple[str, str, str, str, str]
+
+
+def incluir_router(aplicacion, especificacion: EspecificacionRouter):
+    """Importa el módulo del router y lo registra en la aplicación"""
+    modulo, clase, atributo, prefijo, tag = especificacion
+    router = getattr(getattr(importlib.import_module(modulo), clase), atributo)
+    aplicacion.include_router(router, prefix=prefijo, tags=[tag])
+
+
+class RegistroPerezosoMiddleware:
+    """
+    Middleware ASGI que difiere la importación de los routers hasta que llega
+    la primera petición que los necesita.
+
+    Una petición cuyo path empieza con el prefijo de un router pendiente solo
+    registra ese router. Cualquier otra petición (``/docs``, ``/openapi.json``,
+    paths desconocidos...) o un path de ``registrar_todo_en`` registra todos
+    los pendientes para que la documentación y los 404 sean correctos. Debe
+    ser el middleware más externo para que los demás vean las rutas ya
+    registradas.
+    """
+
+    def __init__(self, app, routers: List[EspecificacionRouter], registrar_todo_en: Tuple[str, ...] = ()):
+        self.app = app
+        self.pendientes = list(routers)
+        self.registrar_todo_en = registrar_todo_en
+
+    async def __call__(self, scope, receive, send):
+        if self.pendientes and scope["type"] in ("http", "websocket"):
+            self._registrar(scope)
+        await self.app(scope, receive, send)
+
+    def _registrar(self, scope):
+        path = scope["path"]
+        aplicacion = scope["app"]
+        necesarios = [
+            especificacion for especificacion in self.pendientes
+            if _bajo_prefijo(path, especificacion[3])
+        ]
+        if any(_bajo_prefijo(path, prefijo) for prefijo in self.registrar_todo_en):
+            necesarios = []
+        for especificacion in necesarios or list(self.pendientes):
+            # El registro es síncrono: ninguna otra petición corre en medio
+            incluir_router(aplicacion, especificacion)
+            self.pendientes.remove(especificacion)
+        aplicacion.openapi_schema = None
+
+
+def _bajo_prefijo(path: str, prefijo: str) -> bool:
+    return path == prefijo or path.startswith(prefijo + "/")
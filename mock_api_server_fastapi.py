@@ -7,6 +7,12 @@ las funciones de requests sin depender de servicios externos.
 
 Para ejecutar:
     python mock_api_server_fastapi.py
+
+    En modo producción (varios workers, sin recarga automática):
+    python mock_api_server_fastapi.py --perfil produccion --workers 4
+
+    Perfil de tiempos de arranque (falla si supera el presupuesto):
+    python mock_api_server_fastapi.py --import-profile --presupuesto-ms 800
     
     O usando uvicorn directamente:
     uvicorn mock_api_server_fastapi:app --reload --host 0.0.0.0 --port 8000
@@ -23,50 +29,153 @@ Ventajas de FastAPI:
 - Async/await support
 """
 
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
-
-# Importar los endpoints
-from endpoints.usuarios_endpoint import UsuariosEndPoint
-from endpoints.autenticacion_endpoint import AutenticacionEndPoint
-from endpoints.testing_endpoint import TestingEndPoint
-from endpoints.sistema_endpoint import SistemaEndPoint
-
-# Crear la aplicación FastAPI
-app = FastAPI(
-    title="Mock API Server",
-    description="Servidor mock para pruebas de la librería requests",
-    version="1.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc",
-    tags_metadata=[
-        {
-            "name": "Usuarios",
-            "description": "Operaciones CRUD para gestión de usuarios"
-        },
-        {
-            "name": "Autenticación", 
-            "description": "Endpoints de autenticación y autorización"
-        },
-        {
-            "name": "Testing",
-            "description": "Endpoints para probar diferentes escenarios (errores, timeouts, etc.)"
-        },
-        {
-            "name": "Sistema",
-            "description": "Información del sistema y health checks"
-        }
-    ]
-)
+import os
+from contextlib import asynccontextmanager
+
+from utilidades.entorno import variable_activada
+
+# Las importaciones de FastAPI, routers y middlewares se hacen dentro de
+# crear_app(): el proceso que solo lanza uvicorn (recarga o varios workers)
+# nunca construye la aplicación y arranca mucho más rápido.
+
+# Routers de la API: (módulo, clase, atributo del router, prefijo, tag)
+ROUTERS = [
+    ("endpoints.usuarios_endpoint", "UsuariosEndPoint", "usuarios_router", "/users", "Usuarios"),
+    ("endpoints.autenticacion_endpoint", "AutenticacionEndPoint", "autenticacion_router", "/autenticacion", "Autenticación"),
+    ("endpoints.testing_endpoint", "TestingEndPoint", "testing_router", "/testing", "Testing"),
+    ("endpoints.sistema_endpoint", "SistemaEndPoint", "sistema_router", "/sistema", "Sistema"),
+    ("endpoints.batch_endpoint", "BatchEndPoint", "batch_router", "/batch", "Batch"),
+]
+
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Tareas de arranque y apagado del servidor"""
+    import asyncio
+
+    from middleware.metricas_middleware import metricas_entre_workers
+
+    if not variable_activada("MOCK_API_ROUTERS_PEREZOSOS"):
+        from endpoints.sistema_endpoint import SistemaEndPoint
+
+        # El inventario de /sistema/health se calcula una sola vez, con todas las rutas ya registradas
+        SistemaEndPoint.construir_inventario(app.routes)
+
+    # Con varios workers cada uno publica sus métricas para que /sistema/metrics las sume
+    entre_workers = metricas_entre_workers()
+    publicacion = asyncio.create_task(entre_workers.publicar()) if entre_workers is not None else None
+    yield
+
+    if publicacion is not None:
+        publicacion.cancel()
+        entre_workers.escribir(final=True)
+
+    grabador = getattr(app.state, "grabador", None)
+    if grabador is not None:
+        # Escribir en disco el tráfico que quede en la cola
+        grabador.cerrar()
+
+
+def crear_app():
+    """
+    Construye la aplicación FastAPI.
+
+    Con MOCK_API_ROUTERS_PEREZOSOS=1 los routers (y sus dependencias, como
+    email-validator o los esquemas de seguridad) se importan con la primera
+    petición que los necesita en lugar de al arrancar.
+
+    Con MOCK_API_GRABAR=ruta.jsonl cada petición y su respuesta se agregan
+    a ese archivo (ver benchmarks/replay_trafico.py para reproducirlas).
+
+    Con MOCK_API_SERVER_TIMING=1 y/o MOCK_API_TOKEN_PERFIL=<token> se activa
+    el diagnóstico por petición (ver middleware/diagnostico_middleware.py).
+    """
+    from fastapi import FastAPI
+
+    from middleware.metricas_middleware import MetricasMiddleware, registro_metricas
+    from middleware.registro_perezoso_middleware import RegistroPerezosoMiddleware, incluir_router
+    from utilidades import serializacion
+
+    # Crear la aplicación FastAPI
+    app = FastAPI(
+        lifespan=lifespan,
+        # ORJSONResponse si MOCK_API_JSON_RAPIDO=1 y orjson está instalado
+        default_response_class=serializacion.clase_respuesta_por_defecto(),
+        title="Mock API Server",
+        description="Servidor mock para pruebas de la librería requests",
+        version="1.0.0",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        tags_metadata=[
+            {
+                "name": "Usuarios",
+                "description": "Operaciones CRUD para gestión de usuarios"
+            },
+            {
+                "name": "Autenticación", 
+                "description": "Endpoints de autenticación y autorización"
+            },
+            {
+                "name": "Testing",
+                "description": "Endpoints para probar diferentes escenarios (errores, timeouts, etc.)"
+            },
+            {
+                "name": "Sistema",
+                "description": "Información del sistema y health checks"
+            },
+            {
+                "name": "Batch",
+                "description": "Varias peticiones en un solo round-trip"
+            }
+        ]
+    )
+
+    # Métricas por ruta (expuestas en /sistema/metrics)
+    app.add_middleware(MetricasMiddleware, registro=registro_metricas)
+
+    # Server-Timing por fases y perfil bajo demanda (desactivados por defecto)
+    server_timing = variable_activada("MOCK_API_SERVER_TIMING")
+    perfiles = bool(os.environ.get("MOCK_API_TOKEN_PERFIL"))
+    if server_timing or perfiles:
+        from middleware.diagnostico_middleware import DiagnosticoMiddleware
+
+        app.add_middleware(DiagnosticoMiddleware, server_timing=server_timing, perfiles=perfiles)
+
+    # Grabación del tráfico en JSONL (escritura en un hilo aparte)
+    ruta_grabacion = os.environ.get("MOCK_API_GRABAR")
+    if ruta_grabacion:
+        from middleware.grabacion_middleware import GrabacionMiddleware, GrabadorTrafico
+
+        app.state.grabador = GrabadorTrafico(ruta_grabacion)
+        app.add_middleware(GrabacionMiddleware, grabador=app.state.grabador)
+
+    # Incluir los routers con sus prefijos y tags
+    if variable_activada("MOCK_API_ROUTERS_PEREZOSOS"):
+        # Último middleware agregado = el más externo. El inventario de
+        # /sistema/health necesita todas las rutas registradas
+        app.add_middleware(RegistroPerezosoMiddleware, routers=ROUTERS, registrar_todo_en=("/sistema",))
+    else:
+        for especificacion in ROUTERS:
+            incluir_router(app, especificacion)
+
+    # Endpoint raíz adicional (fuera de los routers)
+    app.get("/", tags=["Sistema"])(root)
+
+    app.exception_handler(404)(not_found_handler)
+    app.exception_handler(422)(validation_exception_handler)
+
+    return app
+
+
+def __getattr__(nombre):
+    """Construye ``app`` la primera vez que se accede (``uvicorn mock_api_server_fastapi:app``)"""
+    if nombre == "app":
+        app = globals()["app"] = crear_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
 
-# Incluir los routers con sus prefijos y tags
-app.include_router(UsuariosEndPoint.usuarios_router, prefix="/users", tags=["Usuarios"])
-app.include_router(AutenticacionEndPoint.autenticacion_router, prefix="/autenticacion", tags=["Autenticación"])
-app.include_router(TestingEndPoint.testing_router, prefix="/testing", tags=["Testing"])
-app.include_router(SistemaEndPoint.sistema_router, prefix="/sistema", tags=["Sistema"])
 
-# Endpoint raíz adicional (fuera de los routers)
-@app.get("/", tags=["Sistema"])
 async def root():
     """Endpoint raíz con información del API"""
     return {
@@ -80,40 +189,155 @@ async def root():
 
 # === MANEJADORES DE ERRORES PERSONALIZADOS ===
 
-@app.exception_handler(404)
 async def not_found_handler(request, exc):
+    from fastapi.responses import JSONResponse
+
     return JSONResponse(
         status_code=404,
         content={"error": "Endpoint not found", "detail": str(exc)}
     )
 
 
-@app.exception_handler(422)
 async def validation_exception_handler(request, exc):
+    from fastapi.responses import JSONResponse
+
     return JSONResponse(
         status_code=422,
         content={"error": "Validation error", "detail": str(exc)}
     )
 
 
+# === CONFIGURACIÓN DE ARRANQUE ===
+
+def parsear_argumentos(argv=None):
+    """
+    Opciones de arranque. Cada opción puede darse también por variable de
+    entorno (MOCK_API_PERFIL, MOCK_API_WORKERS, ...); la línea de comandos
+    tiene prioridad.
+    """
+    import argparse
+
+    entorno = os.environ.get
+    parser = argparse.ArgumentParser(description="Mock API Server con FastAPI")
+    parser.add_argument("--perfil", choices=["desarrollo", "produccion"],
+                        default=entorno("MOCK_API_PERFIL", "desarrollo"),
+                        help="desarrollo: 1 proceso con recarga automática; "
+                             "produccion: N workers sin recarga")
+    parser.add_argument("--host", default=entorno("MOCK_API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(entorno("MOCK_API_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(entorno("MOCK_API_WORKERS", "0")),
+                        help="Procesos worker en producción (0 = uno por núcleo)")
+    parser.add_argument("--loop", choices=["auto", "uvloop", "asyncio"], default=entorno("MOCK_API_LOOP", "auto"),
+                        help="Event loop (auto usa uvloop si está instalado)")
+    parser.add_argument("--http", choices=["auto", "httptools", "h11"], default=entorno("MOCK_API_HTTP", "auto"),
+                        help="Parser HTTP (auto usa httptools si está instalado)")
+    parser.add_argument("--backlog", type=int, default=int(entorno("MOCK_API_BACKLOG", "4096")),
+                        help="Conexiones pendientes máximas en el socket (producción)")
+    parser.add_argument("--keep-alive", type=int, default=int(entorno("MOCK_API_KEEP_ALIVE", "30")),
+                        help="Segundos que se mantiene abierta una conexión inactiva (producción)")
+    parser.add_argument("--almacen", default=entorno("MOCK_API_ALMACEN"),
+                        help="Almacén de usuarios: memoria o sqlite:///ruta.db "
+                             "(con varios workers se usa un SQLite temporal por defecto)")
+    parser.add_argument("--particiones", type=int, default=int(entorno("MOCK_API_PARTICIONES", "1")),
+                        help="Con un almacén SQLite: repartir los usuarios en N archivos para que "
+                             "las escrituras de los workers no compitan por un solo lock")
+    parser.add_argument("--routers-perezosos", action="store_true",
+                        default=variable_activada("MOCK_API_ROUTERS_PEREZOSOS"),
+                        help="Importar cada router con la primera petición que lo usa")
+    parser.add_argument("--grabar", nargs="?", const="requests.jsonl", default=entorno("MOCK_API_GRABAR"),
+                        metavar="RUTA", help="Grabar peticiones y respuestas en un JSONL (por defecto requests.jsonl)")
+    parser.add_argument("--server-timing", action="store_true",
+                        default=variable_activada("MOCK_API_SERVER_TIMING"),
+                        help="Agregar el header Server-Timing con la duración de cada fase")
+    parser.add_argument("--import-profile", action="store_true",
+                        help="Mostrar el desglose de tiempos de importación y salir")
+    parser.add_argument("--presupuesto-ms", type=float,
+                        default=float(entorno("MOCK_API_PRESUPUESTO_ARRANQUE_MS", "0")) or None,
+                        help="Con --import-profile: falla si el arranque en frío supera estos ms")
+    return parser.parse_args(argv)
+
+
+def configuracion_uvicorn(args) -> dict:
+    """Argumentos para uvicorn.run() según el perfil elegido"""
+    # Los workers y el proceso de recarga heredan el entorno
+    if args.routers_perezosos:
+        os.environ["MOCK_API_ROUTERS_PEREZOSOS"] = "1"
+    if args.grabar:
+        os.environ["MOCK_API_GRABAR"] = os.path.abspath(args.grabar)
+    if args.server_timing:
+        os.environ["MOCK_API_SERVER_TIMING"] = "1"
+
+    desarrollo = args.perfil == "desarrollo"
+    workers = 1 if desarrollo else args.workers or os.cpu_count() or 1
+    almacen = args.almacen
+    temporal = None
+    if workers > 1 and (almacen is None or not os.environ.get("MOCK_API_DIR_METRICAS")):
+        import atexit
+        import shutil
+        import tempfile
+        temporal = tempfile.mkdtemp(prefix="mock_api_")
+        # Solo el proceso principal pasa por aquí: los workers terminan antes
+        # que él, así que al salir se puede borrar el SQLite y sus -wal/-shm
+        atexit.register(shutil.rmtree, temporal, ignore_errors=True)
+    if workers > 1 and not os.environ.get("MOCK_API_DIR_METRICAS"):
+        # Un scrape de /sistema/metrics llega a un worker cualquiera: cada
+        # uno deja ahí sus métricas y el que responde las suma
+        os.environ["MOCK_API_DIR_METRICAS"] = os.path.join(temporal, "metricas")
+    if almacen is None and workers > 1:
+        # Cada worker es un proceso aparte: una lista en memoria divergiría
+        # entre ellos, así que comparten un SQLite nuevo en cada arranque
+        almacen = "sqlite:///" + os.path.join(temporal, "usuarios.db")
+    if almacen is not None and almacen.startswith("sqlite:///") and args.particiones > 1:
+        almacen += f"?particiones={args.particiones}"
+    if almacen is not None:
+        # Los workers (o el proceso de recarga) heredan el entorno del proceso principal
+        os.environ["MOCK_API_ALMACEN"] = almacen
+
+    if desarrollo:
+        return {
+            "host": args.host,
+            "port": args.port,
+            "reload": True,  # Recarga automática en desarrollo
+            "log_level": "info"
+        }
+
+    return {
+        "host": args.host,
+        "port": args.port,
+        "workers": workers,
+        "loop": args.loop,
+        "http": args.http,
+        "backlog": args.backlog,
+        "timeout_keep_alive": args.keep_alive,
+        "reload": False,
+        "access_log": False,  # Un log por petición cuesta más que la petición misma
+        "log_level": "warning"
+    }
+
+
 # === FUNCIÓN PRINCIPAL ===
 
 if __name__ == "__main__":
+    args = parsear_argumentos()
+
+    if args.import_profile:
+        from utilidades.perfil_arranque import perfilar_arranque
+
+        raise SystemExit(perfilar_arranque(args.presupuesto_ms, routers_perezosos=args.routers_perezosos))
+
     import uvicorn
+
+    configuracion = configuracion_uvicorn(args)
     
     print("🚀 Iniciando Mock API Server con FastAPI...")
-    print("📡 Servidor disponible en: http://localhost:8000")
-    print("📖 Documentación Swagger: http://localhost:8000/docs")
-    print("📚 Documentación ReDoc: http://localhost:8000/redoc")
-    print("🔍 Health Check: http://localhost:8000/health")
+    print(f"📡 Servidor disponible en: http://localhost:{args.port}")
+    print(f"📖 Documentación Swagger: http://localhost:{args.port}/docs")
+    print(f"📚 Documentación ReDoc: http://localhost:{args.port}/redoc")
+    print(f"🔍 Health Check: http://localhost:{args.port}/sistema/health")
+    if args.perfil == "produccion":
+        print(f"⚙️  Perfil producción: {configuracion['workers']} workers, "
+              f"almacén {os.environ.get('MOCK_API_ALMACEN', 'memoria')}")
     print("🛑 Para detener: Ctrl+C")
     print("-" * 60)
     
-    # Configuración para desarrollo
-    uvicorn.run(
-        "mock_api_server_fastapi:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,  # Recarga automática en desarrollo
-        log_level="info"
-    )
+    uvicorn.run("mock_api_server_fastapi:app", **configuracion)
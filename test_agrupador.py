@@ -0,0 +1,138 @@
+"""
+Tests unitarios del agrupador de peticiones del cliente (main.py)
+=================================================================
+
+Usan una sesión falsa, así que no necesitan el Mock API Server en ejecución.
+
+Para ejecutar: pytest test_agrupador.py -v
+"""
+
+import threading
+import time
+
+import pytest
+import requests
+
+from main import AgrupadorPeticiones
+
+
+class SesionLenta:
+    """Sesión que tarda en responder y cuenta las peticiones recibidas"""
+
+    def __init__(self, demora: float = 0.1, error: Exception = None):
+        self.demora = demora
+        self.error = error
+        self.peticiones = []
+
+    def request(self, metodo, url, params=None, headers=None, **kwargs):
+        self.peticiones.append((metodo, url, params, headers))
+        time.sleep(self.demora)
+        if self.error is not None:
+            raise self.error
+        respuesta = type("Respuesta", (), {})()
+        respuesta.status_code = 200
+        respuesta.url = url
+        return respuesta
+
+
+def en_paralelo(funcion, cantidad: int):
+    resultados = [None] * cantidad
+
+    def trabajo(indice):
+        try:
+            resultados[indice] = funcion()
+        except Exception as error:
+            resultados[indice] = error
+
+    hilos = [threading.Thread(target=trabajo, args=(indice,)) for indice in range(cantidad)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def test_gets_identicos_comparten_una_peticion():
+    sesion = SesionLenta()
+    agrupador = AgrupadorPeticiones(sesion=sesion)
+
+    respuestas = en_paralelo(lambda: agrupador.get("http://api/users/1"), 10)
+
+    assert len(sesion.peticiones) == 1
+    assert all(respuesta is respuestas[0] for respuesta in respuestas)
+    assert (agrupador.enviadas, agrupador.ahorradas) == (1, 9)
+
+
+def test_identidades_distintas_no_se_agrupan():
+    sesion = SesionLenta(demora=0.05)
+    agrupador = AgrupadorPeticiones(sesion=sesion)
+
+    en_paralelo(lambda: agrupador.get("http://api/users/1", headers={"Authorization": "Bearer a"}), 3)
+    en_paralelo(lambda: agrupador.get("http://api/users/1", auth=("admin", "password")), 3)
+    agrupador.get("http://api/users/1", params={"x": 1})
+
+    assert len(sesion.peticiones) == 3
+
+
+def test_params_equivalentes_comparten_clave():
+    sesion = SesionLenta(demora=0.05)
+    agrupador = AgrupadorPeticiones(sesion=sesion)
+
+    variantes = [{"id": [1, 2], "x": "a"}, [("id", 1), ("id", 2), ("x", "a")], "id=1&id=2&x=a"]
+    en_paralelo(lambda: agrupador.get("http://api/users/", params=variantes.pop()), 3)
+    agrupador.get("http://api/users/", params={"id": [2, 1], "x": "a"})
+
+    assert len(sesion.peticiones) == 2
+
+
+class AuthToken(requests.auth.AuthBase):
+    def __init__(self, token):
+        self.token = token
+
+    def __call__(self, peticion):
+        peticion.headers["Authorization"] = f"Bearer {self.token}"
+        return peticion
+
+
+def test_auth_personalizada_no_se_agrupa():
+    sesion = SesionLenta(demora=0.05)
+    agrupador = AgrupadorPeticiones(sesion=sesion, ttl=1.0)
+
+    tokens = ["a", "b", "c"]
+    en_paralelo(lambda: agrupador.get("http://api/users/1", auth=AuthToken(tokens.pop())), 3)
+
+    assert len(sesion.peticiones) == 3
+    assert agrupador.ahorradas == 0
+
+
+def test_escrituras_no_se_agrupan():
+    sesion = SesionLenta(demora=0.05)
+    agrupador = AgrupadorPeticiones(sesion=sesion)
+
+    en_paralelo(lambda: agrupador.request("POST", "http://api/users/"), 3)
+
+    assert len(sesion.peticiones) == 3
+    assert agrupador.ahorradas == 0
+
+
+def test_micro_cache_con_ttl():
+    sesion = SesionLenta(demora=0)
+    agrupador = AgrupadorPeticiones(sesion=sesion, ttl=0.05)
+
+    agrupador.get("http://api/users/")
+    agrupador.get("http://api/users/")
+    time.sleep(0.06)
+    agrupador.get("http://api/users/")
+
+    assert len(sesion.peticiones) == 2
+    assert agrupador.cacheadas == 1
+
+
+def test_el_error_llega_a_todos_los_que_esperaban():
+    agrupador = AgrupadorPeticiones(sesion=SesionLenta(error=ConnectionError("caído")))
+
+    resultados = en_paralelo(lambda: agrupador.get("http://api/users/1"), 4)
+
+    assert all(isinstance(resultado, ConnectionError) for resultado in resultados)
+    with pytest.raises(ConnectionError):
+        agrupador.get("http://api/users/1")
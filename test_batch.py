@@ -0,0 +1,124 @@
+"""
+Tests unitarios del endpoint POST /batch
+========================================
+
+Las sub-peticiones se ejecutan en proceso, así que no necesitan el Mock API
+Server en ejecución.
+
+Para ejecutar: pytest test_batch.py -v
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from endpoints.batch_endpoint import SubPeticion, planificar, resolver
+from utilidades.asgi_local import llamar_asgi
+
+
+def ejecutar_lote(app, peticiones, headers=None):
+    cabeceras = {"content-type": "application/json", **(headers or {})}
+    cuerpo = json.dumps({"requests": peticiones}).encode("utf-8")
+    status, _, respuesta = asyncio.run(llamar_asgi(app, "POST", "/batch", headers=cabeceras, body=cuerpo))
+    return status, json.loads(respuesta)
+
+
+def test_resolver_referencias():
+    resultados = {"login": {"status": 200, "headers": {"etag": '"v1"'}, "body": {"token": "abc", "ids": [7, 8]}}}
+
+    assert resolver("Bearer ${login.body.token}", resultados) == "Bearer abc"
+    assert resolver({"id": "${login.body.ids.1}"}, resultados) == {"id": 8}
+    assert resolver("${login.headers.ETag}", resultados) == '"v1"'
+
+
+@pytest.mark.parametrize("peticiones", [
+    [{"id": "a", "path": "/users/"}, {"id": "a", "path": "/users/"}],
+    [{"path": "/users/${otro.body.id}"}],
+    [{"id": "a", "path": "/users/", "depends_on": ["b"]}, {"id": "b", "path": "/users/${a.status}"}],
+    [{"path": "/batch"}],
+])
+def test_planificar_rechaza_lotes_invalidos(peticiones):
+    with pytest.raises(HTTPException) as error:
+        planificar([SubPeticion(**peticion) for peticion in peticiones])
+    assert error.value.status_code == 400
+
+
+def test_flujo_login_bearer_y_crud(app):
+    status, cuerpo = ejecutar_lote(app, [
+        {"id": "login", "method": "POST", "path": "/autenticacion/login",
+         "form": {"username": "admin", "password": "password"}},
+        {"id": "bearer", "path": "/autenticacion/bearer", "headers": {"Authorization": "Bearer ${login.body.token}"}},
+        {"id": "crear", "method": "POST", "path": "/users/", "body": {"name": "Ana", "email": "ana@example.com"}},
+        {"id": "leer", "path": "/users/${crear.body.id}"},
+        {"id": "borrar", "method": "DELETE", "path": "/users/${crear.body.id}",
+         "headers": {"If-Match": "${leer.headers.etag}"}},
+    ])
+
+    assert status == 200
+    respuestas = {respuesta["id"]: respuesta for respuesta in cuerpo["responses"]}
+    assert [respuesta["id"] for respuesta in cuerpo["responses"]] == ["login", "bearer", "crear", "leer", "borrar"]
+    assert respuestas["bearer"]["body"]["token"] == "abc123token"
+    assert respuestas["leer"]["body"] == {"id": 4, "name": "Ana", "email": "ana@example.com"}
+    assert (respuestas["borrar"]["status"], respuestas["borrar"]["body"]) == (204, None)
+
+
+def test_dependencia_fallida(app):
+    _, cuerpo = ejecutar_lote(app, [
+        {"id": "falta", "path": "/users/99"},
+        {"id": "depende", "path": "/users/${falta.body.id}"},
+        {"id": "independiente", "path": "/users/1"},
+    ])
+
+    assert [respuesta["status"] for respuesta in cuerpo["responses"]] == [404, 424, 200]
+
+
+def test_authorization_del_lote_se_propaga(app):
+    _, cuerpo = ejecutar_lote(app, [{"path": "/autenticacion/bearer"}], headers={"Authorization": "Bearer token456"})
+
+    assert cuerpo["responses"][0]["status"] == 200
+
+
+def test_path_resuelto_a_batch_se_rechaza_por_paso(app):
+    _, cuerpo = ejecutar_lote(app, [
+        {"id": "ruta", "method": "POST", "path": "/users/", "body": {"name": "/batch", "email": "b@example.com"}},
+        {"id": "anidado", "method": "POST", "path": "${ruta.body.name}", "body": {"requests": []}},
+        {"id": "relativo", "path": "${ruta.body.email}"},
+        {"id": "normal", "path": "/users/1"},
+    ])
+
+    assert [respuesta["status"] for respuesta in cuerpo["responses"]] == [201, 400, 400, 200]
+
+
+def test_sub_peticiones_no_se_graban_ni_se_miden(usuarios_aislados, monkeypatch, tmp_path):
+    from middleware.metricas_middleware import registro_metricas
+    from mock_api_server_fastapi import crear_app
+
+    ruta = tmp_path / "trafico.jsonl"
+    monkeypatch.setenv("MOCK_API_GRABAR", str(ruta))
+    app = crear_app()
+    registro_metricas.reiniciar()
+
+    ejecutar_lote(app, [{"path": "/users/1"}, {"path": "/users/2"}])
+    app.state.grabador.cerrar()
+
+    assert [json.loads(linea)["path"] for linea in ruta.read_text(encoding="utf-8").splitlines()] == ["/batch"]
+    assert [ruta for _, ruta in registro_metricas.rutas] == ["/batch"]
+
+
+def test_un_paso_que_falla_no_tumba_el_lote(app):
+    async def explota():
+        raise RuntimeError("falla")
+
+    app.add_api_route("/explota", explota)
+
+    status, cuerpo = ejecutar_lote(app, [
+        {"id": "falla", "path": "/explota"},
+        {"id": "depende", "path": "/users/1", "depends_on": ["falla"]},
+        {"id": "cabecera", "path": "/users/1", "headers": {"x": "ñ€"}},
+        {"id": "normal", "path": "/users/1"},
+    ])
+
+    assert status == 200
+    assert [respuesta["status"] for respuesta in cuerpo["responses"]] == [500, 424, 400, 200]
@@ -0,0 +1,85 @@
+"""
+Tests unitarios de la caché de páginas de GET /users
+====================================================
+
+No necesitan el Mock API Server en ejecución.
+
+Para ejecutar: pytest test_cache_paginas.py -v
+"""
+
+import asyncio
+import json
+
+from almacenamiento.cache_paginas import CachePaginas
+from endpoints.usuarios_endpoint import UsuariosEndPoint
+from utilidades.asgi_local import llamar_asgi
+
+
+class TestCachePaginas:
+
+    def test_lru_por_cantidad(self):
+        cache = CachePaginas(capacidad=2)
+        cache.guardar("a", b"1")
+        cache.guardar("b", b"2")
+        cache.obtener("a")
+        cache.guardar("c", b"3")
+
+        assert cache.obtener("b") is None
+        assert cache.obtener("a") == b"1"
+        assert cache.estadisticas()["entries"] == 2
+
+    def test_acotada_por_bytes(self):
+        cache = CachePaginas(capacidad=10, max_bytes=5)
+        cache.guardar("a", b"123")
+        cache.guardar("b", b"456")
+        cache.guardar("enorme", b"x" * 6)
+
+        assert cache.obtener("a") is None
+        assert cache.obtener("enorme") is None
+        assert cache.bytes == 3
+
+    def test_estadisticas_e_invalidacion(self):
+        cache = CachePaginas()
+        cache.guardar("a", b"123")
+        cache.obtener("a")
+        cache.obtener("b")
+        cache.invalidar()
+
+        estadisticas = cache.estadisticas()
+        assert (estadisticas["hits"], estadisticas["misses"], estadisticas["hit_ratio"]) == (1, 1, 0.5)
+        assert (estadisticas["entries"], estadisticas["bytes"], estadisticas["invalidations"]) == (0, 0, 1)
+
+    def test_desactivada(self):
+        cache = CachePaginas(capacidad=0)
+        cache.guardar("a", b"1")
+
+        assert not cache.activa
+        assert cache.obtener("a") is None
+
+
+def test_escrituras_invalidan_las_paginas(app):
+    async def escenario():
+        _, _, antes = await llamar_asgi(app, "GET", "/users/?limit=2")
+        await llamar_asgi(app, "GET", "/users/?limit=2")
+        await llamar_asgi(app, "PUT", "/users/1", headers={"content-type": "application/json"},
+                          body=b'{"name": "Juana"}')
+        _, _, despues = await llamar_asgi(app, "GET", "/users/?limit=2")
+        return json.loads(antes), json.loads(despues)
+
+    antes, despues = asyncio.run(escenario())
+
+    assert antes["users"][0]["name"] == "Juan Pérez"
+    assert despues["users"][0]["name"] == "Juana"
+    estadisticas = UsuariosEndPoint.cache_paginas.estadisticas()
+    assert (estadisticas["hits"], estadisticas["misses"], estadisticas["invalidations"]) == (1, 2, 1)
+
+
+def test_escritura_de_otro_worker_no_sirve_paginas_viejas(app):
+    async def escenario():
+        await llamar_asgi(app, "GET", "/users/")
+        # Escritura directa al almacén, sin pasar por este worker
+        UsuariosEndPoint.repositorio.crear("Ana", "ana@example.com")
+        _, _, cuerpo = await llamar_asgi(app, "GET", "/users/")
+        return json.loads(cuerpo)
+
+    assert asyncio.run(escenario())["total"] == 4
@@ -0,0 +1,111 @@
+"""
+Tests unitarios de las peticiones condicionales (ETag, If-None-Match, If-Match)
+===============================================================================
+
+No necesitan el Mock API Server en ejecución.
+
+Para ejecutar: pytest test_condicional.py -v
+"""
+
+import pytest
+
+from almacenamiento.cache_paginas import CachePaginas
+from endpoints.usuarios_endpoint import UsuariosEndPoint
+from main import CacheValidadores
+from utilidades.asgi_local import pedir
+from utilidades.condicional import coincide_if_none_match, etag_usuario, versiones_if_match
+
+
+class TestCabeceras:
+
+    @pytest.mark.parametrize("cabecera, coincide", [
+        (None, False),
+        ("", False),
+        ('"e1-u1-v1"', True),
+        ('W/"e1-u1-v1"', True),
+        ('"otro", "e1-u1-v1"', True),
+        ("*", True),
+        ('"e1-u1-v2"', False),
+    ])
+    def test_if_none_match(self, cabecera, coincide):
+        assert coincide_if_none_match(cabecera, etag_usuario("e1", 1, 1)) is coincide
+
+    @pytest.mark.parametrize("cabecera, versiones", [
+        (None, None),
+        ("*", None),
+        ('"e1-u1-v3"', {3}),
+        ('"e1-u1-v3", "e1-u1-v4"', {3, 4}),
+        ('"e2-u1-v3"', set()),
+        ('"e1-u2-v3"', set()),
+        ('W/"e1-u1-v3"', set()),
+        ("basura", set()),
+    ])
+    def test_if_match(self, cabecera, versiones):
+        assert versiones_if_match(cabecera, "e1", 1) == versiones
+
+
+@pytest.mark.parametrize("capacidad", [0, 16], ids=["sin_cache", "con_cache"])
+def test_lista_304_con_if_none_match(app, monkeypatch, capacidad):
+    monkeypatch.setattr(UsuariosEndPoint, "cache_paginas", CachePaginas(capacidad))
+
+    status, cabeceras, _ = pedir(app, "GET", "/users/?limit=2")
+    assert status == 200
+
+    status, cabeceras_304, cuerpo = pedir(app, "GET", "/users/?limit=2", headers={"If-None-Match": cabeceras["etag"]})
+    assert (status, cuerpo, cabeceras_304["etag"]) == (304, b"", cabeceras["etag"])
+    assert pedir(app, "GET", "/users/?limit=3", headers={"If-None-Match": cabeceras["etag"]})[0] == 200
+
+
+def test_usuario_304_con_if_none_match(app):
+    _, cabeceras, _ = pedir(app, "GET", "/users/1")
+
+    status, _, cuerpo = pedir(app, "GET", "/users/1", headers={"If-None-Match": cabeceras["etag"]})
+
+    assert (status, cuerpo) == (304, b"")
+    assert pedir(app, "GET", "/users/2", headers={"If-None-Match": cabeceras["etag"]})[0] == 200
+
+
+@pytest.mark.parametrize("metodo, body", [("PUT", b'{"name": "Otra"}'), ("DELETE", b"")])
+def test_if_match_viejo_responde_412_con_etag_actual(app, metodo, body):
+    _, cabeceras, _ = pedir(app, "GET", "/users/1")
+    viejo = cabeceras["etag"]
+    status, cabeceras, _ = pedir(app, "PUT", "/users/1", body=b'{"name": "Juana"}',
+                                 headers={"content-type": "application/json", "If-Match": viejo})
+    assert status == 200
+    actual = cabeceras["etag"]
+
+    status, cabeceras, _ = pedir(app, metodo, "/users/1", body=body,
+                                 headers={"content-type": "application/json", "If-Match": viejo})
+
+    assert (status, cabeceras["etag"]) == (412, actual)
+    assert pedir(app, "GET", "/users/1")[2] == b'{"id":1,"name":"Juana","email":"juan@example.com"}'
+
+
+class SesionValidadores:
+    """Sesión falsa que responde 304 si el If-None-Match coincide con su ETag"""
+
+    def __init__(self, etag='"v1"'):
+        self.etag = etag
+        self.peticiones = []
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        self.peticiones.append(dict(headers or {}))
+        respuesta = type("Respuesta", (), {})()
+        respuesta.headers = {"ETag": self.etag}
+        respuesta.status_code = 304 if (headers or {}).get("If-None-Match") == self.etag else 200
+        return respuesta
+
+
+def test_cache_validadores_retorna_la_respuesta_guardada_en_304():
+    sesion = SesionValidadores()
+    cache = CacheValidadores(sesion=sesion)
+
+    primera = cache.get("http://api/users/1", params=[("x", 1)])
+    segunda = cache.get("http://api/users/1", params={"x": 1})
+    sesion.etag = '"v2"'
+    tercera = cache.get("http://api/users/1", params={"x": 1})
+
+    assert segunda is primera
+    assert tercera is not primera and tercera.status_code == 200
+    assert [peticion.get("If-None-Match") for peticion in sesion.peticiones] == [None, '"v1"', '"v1"']
+    assert (cache.aciertos, cache.fallos) == (1, 2)
@@ -0,0 +1,102 @@
+"""
+Tests unitarios de Server-Timing y del perfil bajo demanda
+==========================================================
+
+No necesitan el Mock API Server en ejecución.
+
+Para ejecutar: pytest test_diagnostico.py -v
+"""
+
+import base64
+import os
+
+import fastapi.routing
+import pytest
+
+import middleware.diagnostico_middleware as diagnostico
+from mock_api_server_fastapi import crear_app
+from utilidades.asgi_local import pedir
+
+
+BASIC_ADMIN = "Basic " + base64.b64encode(b"admin:password").decode("ascii")
+
+
+@pytest.fixture(autouse=True)
+def entorno(usuarios_aislados, monkeypatch, tmp_path):
+    monkeypatch.delenv("MOCK_API_SERVER_TIMING", raising=False)
+    monkeypatch.delenv("MOCK_API_TOKEN_PERFIL", raising=False)
+    monkeypatch.setenv("MOCK_API_DIR_PERFILES", str(tmp_path))
+
+
+def test_sin_diagnostico_no_hay_headers():
+    _, cabeceras, _ = pedir(crear_app(), "GET", "/users/1", headers={"x-debug-profile": "cualquiera"})
+
+    assert "server-timing" not in cabeceras
+    assert "x-debug-profile-id" not in cabeceras
+
+
+def test_server_timing_por_fases(monkeypatch):
+    monkeypatch.setenv("MOCK_API_SERVER_TIMING", "1")
+
+    status, cabeceras, _ = pedir(crear_app(), "GET", "/autenticacion/basic-auth", headers={"authorization": BASIC_ADMIN})
+
+    assert status == 200
+    fases = [entrada.split(";")[0] for entrada in cabeceras["server-timing"].split(", ")]
+    assert fases == ["route", "deps", "handler", "serialize", "total"]
+
+
+def test_perfil_con_token(monkeypatch):
+    monkeypatch.setenv("MOCK_API_TOKEN_PERFIL", "secreto")
+    app = crear_app()
+
+    _, cabeceras, _ = pedir(app, "PUT", "/users/1", body=b'{"name": "Juana"}',
+                            headers={"content-type": "application/json", "x-debug-profile": "secreto"})
+    perfil_id = cabeceras["x-debug-profile-id"]
+
+    status, _, resumen = pedir(app, "GET", f"/sistema/profiles/{perfil_id}", headers={"x-debug-profile": "secreto"})
+    assert status == 200
+    assert b"function calls" in resumen
+    assert pedir(app, "GET", f"/sistema/profiles/{perfil_id}")[0] == 403
+    assert pedir(app, "GET", "/sistema/profiles/..%2Fsecreto", headers={"x-debug-profile": "secreto"})[0] == 404
+
+
+def test_token_incorrecto_no_perfila(monkeypatch):
+    monkeypatch.setenv("MOCK_API_TOKEN_PERFIL", "secreto")
+
+    _, cabeceras, _ = pedir(crear_app(), "GET", "/users/1", headers={"x-debug-profile": "otro"})
+
+    assert "x-debug-profile-id" not in cabeceras
+
+
+def test_conserva_los_ultimos_perfiles(monkeypatch, tmp_path):
+    monkeypatch.setenv("MOCK_API_TOKEN_PERFIL", "secreto")
+    monkeypatch.setenv("MOCK_API_MAX_PERFILES", "2")
+    app = crear_app()
+
+    for _ in range(3):
+        pedir(app, "GET", "/users/1", headers={"x-debug-profile": "secreto"})
+
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_rotar_perfiles_borra_los_mas_viejos(tmp_path):
+    for posicion, nombre in enumerate(["c", "a", "b"]):
+        ruta = tmp_path / f"{nombre}.prof"
+        ruta.write_bytes(b"")
+        os.utime(ruta, (posicion, posicion))
+    (tmp_path / "otro.txt").write_bytes(b"")
+
+    diagnostico.rotar_perfiles(str(tmp_path), 2)
+
+    assert sorted(os.listdir(tmp_path)) == ["a.prof", "b.prof", "otro.txt"]
+
+
+def test_medicion_falla_si_fastapi_cambio(monkeypatch):
+    monkeypatch.setattr(diagnostico, "_instalado", False)
+    monkeypatch.setattr(fastapi.routing, "serialize_response", lambda *args, **kwargs: None)
+    originales = {nombre: getattr(fastapi.routing, nombre) for _, nombre in diagnostico.FUNCIONES_POR_FASE}
+
+    with pytest.raises(RuntimeError, match="serialize_response"):
+        diagnostico.instalar_medicion_fases()
+
+    assert {nombre: getattr(fastapi.routing, nombre) for nombre in originales} == originales
@@ -0,0 +1,95 @@
+"""
+Tests unitarios del feed de cambios de usuarios
+===============================================
+
+No necesitan el Mock API Server en ejecución.
+
+Para ejecutar: pytest test_feed_cambios.py -v
+"""
+
+import asyncio
+
+from almacenamiento.feed_cambios import LATIDO, FeedCambios, evento_sse
+
+
+async def recibir(flujo, cantidad: int):
+    return [await asyncio.wait_for(flujo.__anext__(), 1) for _ in range(cantidad)]
+
+
+def test_formato_sse():
+    assert evento_sse("0a1b2c3d-7", "created", {"id": 4, "name": "Ñandú"}) == (
+        'id: 0a1b2c3d-7\nevent: created\ndata: {"id": 4, "name": "Ñandú"}\n\n'.encode("utf-8")
+    )
+
+
+def test_suscriptores_comparten_los_bytes_del_evento():
+    async def escenario():
+        feed = FeedCambios()
+        flujos = [feed.suscribir() for _ in range(3)]
+        esperas = [asyncio.ensure_future(recibir(flujo, 1)) for flujo in flujos]
+        await asyncio.sleep(0.05)  # Todos los suscriptores quedan esperando
+        feed.publicar("deleted", {"id": 2})
+        recibidos = [(await espera)[0] for espera in esperas]
+        suscriptores = feed.suscriptores
+        for flujo in flujos:
+            await flujo.aclose()
+        return feed, recibidos, suscriptores, feed.suscriptores
+
+    feed, recibidos, suscriptores, al_cerrar = asyncio.run(escenario())
+
+    assert recibidos[0] == evento_sse(f"{feed.epoca}-1", "deleted", {"id": 2})
+    assert all(evento is recibidos[0] for evento in recibidos)
+    assert (suscriptores, al_cerrar) == (3, 0)
+
+
+def test_reanuda_desde_last_event_id():
+    async def escenario():
+        feed = FeedCambios()
+        for user_id in range(1, 5):
+            feed.publicar("created", {"id": user_id})
+        return feed, await recibir(feed.suscribir(feed.seq_desde_id(f"{feed.epoca}-2")), 2)
+
+    feed, eventos = asyncio.run(escenario())
+
+    assert eventos == [
+        evento_sse(f"{feed.epoca}-3", "created", {"id": 3}),
+        evento_sse(f"{feed.epoca}-4", "created", {"id": 4}),
+    ]
+
+
+def test_reset_si_el_id_ya_no_esta_en_el_buffer():
+    async def escenario():
+        feed = FeedCambios(capacidad=2)
+        for user_id in range(1, 5):
+            feed.publicar("created", {"id": user_id})
+        viejo = await recibir(feed.suscribir(ultimo=1), 1)
+        desconocido = await recibir(feed.suscribir(ultimo=99), 1)
+        return feed, viejo + desconocido
+
+    feed, eventos = asyncio.run(escenario())
+
+    assert eventos == [evento_sse(f"{feed.epoca}-4", "reset", {"seq": 4})] * 2
+
+
+def test_reset_si_el_id_es_de_otra_epoca():
+    async def escenario():
+        anterior, actual = FeedCambios(), FeedCambios()
+        for feed in (anterior, actual):
+            for user_id in range(1, 4):
+                feed.publicar("created", {"id": user_id})
+        # Misma secuencia, pero publicada por otro proceso
+        ultimo = actual.seq_desde_id(anterior.id_evento(2))
+        return actual, ultimo, await recibir(actual.suscribir(ultimo), 1)
+
+    actual, ultimo, eventos = asyncio.run(escenario())
+
+    assert ultimo == -1
+    assert eventos == [evento_sse(f"{actual.epoca}-3", "reset", {"seq": 3})]
+    assert [actual.seq_desde_id(valor) for valor in (None, "7", f"{actual.epoca}-x")] == [None, -1, -1]
+
+
+def test_latido_sin_eventos():
+    async def escenario():
+        return await recibir(FeedCambios().suscribir(intervalo_latido=0.01), 1)
+
+    assert asyncio.run(escenario()) == [LATIDO]
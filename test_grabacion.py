@@ -0,0 +1,169 @@
+"""
+Tests unitarios de la grabación y lectura de tráfico
+====================================================
+
+No necesitan el Mock API Server en ejecución.
+
+Para ejecutar: pytest test_grabacion.py -v
+"""
+
+import asyncio
+import errno
+import json
+import threading
+import time
+
+from benchmarks.replay_trafico import ResultadoReplay, cuerpo_original, enviar, leer_registros
+from middleware import grabacion_middleware
+from middleware.grabacion_middleware import MAX_CUERPO_GRABADO, GrabacionMiddleware, GrabadorTrafico
+from utilidades.asgi_local import llamar_asgi
+
+
+async def app_eco(scope, receive, send):
+    """App ASGI mínima que responde con el cuerpo recibido"""
+    mensaje = await receive()
+    await send({"type": "http.response.start", "status": 201, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": mensaje["body"]})
+
+
+def test_graba_peticion_y_respuesta(tmp_path):
+    ruta = tmp_path / "trafico.jsonl"
+    grabador = GrabadorTrafico(str(ruta))
+    app = GrabacionMiddleware(app_eco, grabador)
+
+    status, _, cuerpo = asyncio.run(llamar_asgi(
+        app, "POST", "/users/?page=2", headers={"X-Custom-Header": "valor"}, body="ñandú".encode("utf-8")
+    ))
+    grabador.cerrar()
+
+    assert (status, cuerpo) == (201, "ñandú".encode("utf-8"))
+    registro = json.loads(ruta.read_text(encoding="utf-8"))
+    assert registro["method"] == "POST"
+    assert registro["path"] == "/users/"
+    assert registro["query"] == "page=2"
+    assert registro["headers"]["x-custom-header"] == "valor"
+    assert registro["body"] == {"text": "ñandú"}
+    assert registro["status"] == 201
+    assert registro["response_body"] == {"text": "ñandú"}
+    assert registro["latency_ms"] >= 0
+
+
+def test_cuerpo_binario_ida_y_vuelta(tmp_path):
+    ruta = tmp_path / "trafico.jsonl"
+    grabador = GrabadorTrafico(str(ruta))
+    app = GrabacionMiddleware(app_eco, grabador)
+
+    for _ in range(3):
+        asyncio.run(llamar_asgi(app, "PUT", "/binario", body=b"\xff\x00\xfe"))
+    grabador.cerrar()
+
+    registros = list(leer_registros(str(ruta)))
+    assert len(registros) == 3
+    assert all(cuerpo_original(registro) == b"\xff\x00\xfe" for registro in registros)
+
+
+def test_cuerpo_de_peticion_largo_se_captura_con_tope(tmp_path):
+    ruta = tmp_path / "trafico.jsonl"
+    grabador = GrabadorTrafico(str(ruta))
+    trozos = [b"a" * (MAX_CUERPO_GRABADO // 2)] * 6
+    recibidos = []
+
+    async def app_lectora(scope, receive, send):
+        while True:
+            mensaje = await receive()
+            recibidos.append(mensaje["body"])
+            if not mensaje.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    pendientes = [
+        {"type": "http.request", "body": trozo, "more_body": i < len(trozos) - 1}
+        for i, trozo in enumerate(trozos)
+    ]
+
+    async def receive():
+        return pendientes.pop(0)
+
+    async def send(mensaje):
+        pass
+
+    scope = {"type": "http", "method": "POST", "path": "/subida", "query_string": b"", "headers": []}
+    asyncio.run(GrabacionMiddleware(app_lectora, grabador)(scope, receive, send))
+    grabador.cerrar()
+
+    # La app recibe el cuerpo entero; la grabación solo hasta el tope
+    assert b"".join(recibidos) == b"".join(trozos)
+    registro = json.loads(ruta.read_text(encoding="utf-8"))
+    assert registro["body"]["truncated"] is True
+    assert len(registro["body"]["text"]) == MAX_CUERPO_GRABADO
+
+
+def test_un_error_de_escritura_no_detiene_el_hilo(tmp_path, monkeypatch):
+    ruta = tmp_path / "trafico.jsonl"
+    write_original = grabacion_middleware.os.write
+    fallos = [OSError(errno.ENOSPC, "No space left on device")]
+
+    def write_que_falla_una_vez(descriptor, datos):
+        if fallos:
+            raise fallos.pop()
+        return write_original(descriptor, datos)
+
+    monkeypatch.setattr(grabacion_middleware.os, "write", write_que_falla_una_vez)
+    grabador = GrabadorTrafico(str(ruta), intervalo_flush=0.01)
+    app = GrabacionMiddleware(app_eco, grabador)
+
+    asyncio.run(llamar_asgi(app, "POST", "/primero", body=b"1"))
+    limite = time.monotonic() + 5
+    while not grabador.fallidos and time.monotonic() < limite:
+        time.sleep(0.01)
+    asyncio.run(llamar_asgi(app, "POST", "/segundo", body=b"2"))
+    grabador.cerrar()
+
+    assert grabador.fallidos == 1
+    assert [registro["path"] for registro in leer_registros(str(ruta))] == ["/segundo"]
+
+
+def test_cola_llena_descarta_y_cuenta(tmp_path, monkeypatch):
+    ruta = tmp_path / "trafico.jsonl"
+    liberar = threading.Event()
+    convertir_original = grabacion_middleware._registro_a_json
+
+    def convertir_bloqueando(registro):
+        liberar.wait(5)
+        return convertir_original(registro)
+
+    monkeypatch.setattr(grabacion_middleware, "_registro_a_json", convertir_bloqueando)
+    grabador = GrabadorTrafico(str(ruta), intervalo_flush=0.01, max_pendientes=2)
+    app = GrabacionMiddleware(app_eco, grabador)
+
+    # El primero lo retiene el hilo escritor; dos más llenan la cola
+    asyncio.run(llamar_asgi(app, "POST", "/0", body=b"0"))
+    limite = time.monotonic() + 5
+    while not grabador._cola.empty() and time.monotonic() < limite:
+        time.sleep(0.01)
+    for i in range(1, 6):
+        asyncio.run(llamar_asgi(app, "POST", f"/{i}", body=b"x"))
+    liberar.set()
+    grabador.cerrar()
+
+    assert grabador.descartados == 3
+    assert grabador.grabados == 3
+    assert [registro["path"] for registro in leer_registros(str(ruta))] == ["/0", "/1", "/2"]
+
+
+def test_replay_omite_registros_no_reproducibles():
+    registros = [
+        {"method": "GET", "path": "/users/changes", "status": 200,
+         "response_headers": {"content-type": "text/event-stream; charset=utf-8"}},
+        {"method": "POST", "path": "/users/", "status": 201,
+         "body": {"text": '{"name": "A', "truncated": True}, "response_headers": {}},
+    ]
+    resultado = ResultadoReplay()
+
+    # Se omiten antes de usar la sesión
+    for registro in registros:
+        asyncio.run(enviar(None, "http://localhost:8000", registro, resultado))
+
+    assert (resultado.enviadas, resultado.status_distinto) == (0, 0)
+    assert resultado.omitidas == {"stream SSE": 1, "cuerpo truncado": 1}
@@ -0,0 +1,175 @@
+"""
+Tests unitarios del histograma y registro de métricas
+=====================================================
+
+No necesitan el Mock API Server en ejecución.
+
+Para ejecutar: pytest test_metricas.py -v
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from middleware.metricas_middleware import (
+    RUTA_DESCONOCIDA,
+    HistogramaLatencia,
+    MetricasEntreWorkers,
+    RegistroMetricas,
+    registro_metricas,
+)
+from utilidades.asgi_local import llamar_asgi
+
+
+class TestHistogramaLatencia:
+
+    def test_valores_pequenos_son_exactos(self):
+        for valor in range(16):
+            indice = HistogramaLatencia.indice(valor)
+            assert HistogramaLatencia.limite_superior(indice) == valor
+
+    def test_error_relativo_acotado(self):
+        for valor in (17, 100, 999, 12_345, 1_000_000, 987_654_321):
+            tope = HistogramaLatencia.limite_superior(HistogramaLatencia.indice(valor))
+            assert valor <= tope
+            assert (tope - valor) / valor <= 0.125
+
+    def test_percentiles(self):
+        histograma = HistogramaLatencia()
+        for valor in range(1, 1001):
+            histograma.registrar(valor)
+
+        assert histograma.count == 1000
+        assert histograma.max_us == 1000
+        assert 440 <= histograma.percentil(50) <= 570
+        assert 980 <= histograma.percentil(99) <= 1000
+
+    def test_buckets_acumulados(self):
+        histograma = HistogramaLatencia()
+        histograma.registrar(200)        # 0.2 ms
+        histograma.registrar(3_000)      # 3 ms
+        histograma.registrar(2_000_000)  # 2 s
+
+        assert histograma.acumulado_por_limite((0.001, 0.005, 1.0, 5.0)) == [1, 2, 2, 3]
+
+
+class TestRegistroMetricas:
+
+    def test_exposicion_prometheus(self):
+        registro = RegistroMetricas()
+        estadisticas = registro.estadisticas("GET", "/users/{user_id}")
+        estadisticas.latencia.registrar(1500)
+        estadisticas.status[200] = 1
+
+        texto = registro.como_prometheus()
+
+        assert 'method="GET",route="/users/{user_id}",status="200"} 1' in texto
+        assert 'route="/users/{user_id}",le="+Inf"} 1' in texto
+        assert "# TYPE mock_api_http_request_duration_seconds histogram" in texto
+
+    def test_resumen_json(self):
+        registro = RegistroMetricas()
+        registro.estadisticas("POST", "/users/").status[201] = 2
+
+        ruta = registro.como_dict()["routes"][0]
+
+        assert ruta["route"] == "/users/"
+        assert ruta["status"] == {"201": 2}
+
+
+class TestMetricasMiddleware:
+
+    @pytest.fixture
+    def registro(self, app):
+        registro_metricas.reiniciar()
+        yield registro_metricas
+        registro_metricas.reiniciar()
+
+    def test_ruta_plantilla_y_status(self, app, registro):
+        asyncio.run(llamar_asgi(app, "GET", "/users/7"))
+        asyncio.run(llamar_asgi(app, "GET", "/users/1"))
+
+        estadisticas = registro.rutas[("GET", "/users/{user_id}")]
+        assert estadisticas.status == {404: 1, 200: 1}
+        assert estadisticas.latencia.count == 2
+        assert estadisticas.en_curso == 0
+        assert all("/users/7" not in ruta for _, ruta in registro.rutas)
+
+    def test_ruta_inexistente(self, app, registro):
+        asyncio.run(llamar_asgi(app, "GET", "/no/existe/123"))
+
+        assert registro.rutas[("GET", RUTA_DESCONOCIDA)].status == {404: 1}
+
+    def test_en_curso_baja_si_el_handler_falla(self, app, registro):
+        async def explota():
+            raise RuntimeError("falla")
+
+        app.add_api_route("/explota", explota)
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(llamar_asgi(app, "GET", "/explota"))
+
+        estadisticas = registro.rutas[("GET", "/explota")]
+        assert (estadisticas.en_curso, estadisticas.status) == (0, {500: 1})
+
+
+def instantanea_de_otro_worker(pid: int) -> dict:
+    otro = RegistroMetricas()
+    estadisticas = otro.estadisticas("GET", "/users/{user_id}")
+    estadisticas.status[200] = 2
+    estadisticas.en_curso = 1
+    estadisticas.latencia.registrar(5000)
+    estadisticas.latencia.registrar(5000)
+    # Ida y vuelta por JSON, como al leer el archivo del otro worker
+    return json.loads(json.dumps({**otro.instantanea(), "pid": pid}))
+
+
+class TestMetricasEntreWorkers:
+
+    def test_fusionar_instantaneas(self):
+        propio = RegistroMetricas()
+        estadisticas = propio.estadisticas("GET", "/users/{user_id}")
+        estadisticas.status[200] = 1
+        estadisticas.latencia.registrar(1000)
+
+        agregado = RegistroMetricas()
+        agregado.fusionar(json.loads(json.dumps(propio.instantanea())))
+        agregado.fusionar(instantanea_de_otro_worker(1))
+
+        suma = agregado.estadisticas("GET", "/users/{user_id}")
+        assert (suma.status, suma.en_curso, suma.latencia.count, suma.latencia.max_us) == ({200: 3}, 1, 3, 5000)
+        # Dos de las tres muestras son del otro worker (5 ms)
+        assert suma.latencia.percentil(50) == 5000
+
+    def test_instantanea_final_sin_peticiones_en_curso(self):
+        registro = RegistroMetricas()
+        registro.estadisticas("GET", "/").en_curso = 2
+
+        assert registro.instantanea(final=True)["rutas"][0][2] == 0
+
+    def test_metrics_suma_todos_los_workers(self, app, monkeypatch, tmp_path):
+        monkeypatch.setenv("MOCK_API_DIR_METRICAS", str(tmp_path))
+        registro_metricas.reiniciar()
+        (tmp_path / "1.json").write_text(json.dumps(instantanea_de_otro_worker(1)), encoding="utf-8")
+
+        asyncio.run(llamar_asgi(app, "GET", "/users/1"))
+        _, _, cuerpo = asyncio.run(llamar_asgi(app, "GET", "/sistema/metrics?format=json"))
+        _, _, texto = asyncio.run(llamar_asgi(app, "GET", "/sistema/metrics"))
+        registro_metricas.reiniciar()
+
+        metricas = json.loads(cuerpo)
+        assert len(metricas["workers"]) == 2
+        ruta = next(r for r in metricas["routes"] if r["route"] == "/users/{user_id}")
+        assert ruta["status"] == {"200": 3}
+        assert 'mock_api_http_requests_total{method="GET",route="/users/{user_id}",status="200"} 3' in texto.decode()
+        assert "pid=" not in texto.decode()
+        assert metricas["users_page_cache"]["capacity"] == 256
+
+    def test_sin_directorio_no_escribe(self, tmp_path):
+        entre_workers = MetricasEntreWorkers(str(tmp_path / "metricas"), RegistroMetricas())
+
+        agregado, instantaneas = entre_workers.agregar()
+
+        assert [instantanea["pid"] for instantanea in instantaneas] == agregado.workers
+        assert len(agregado.workers) == 1
@@ -0,0 +1,89 @@
+"""
+Tests unitarios del registro perezoso de routers y del perfil de arranque
+=========================================================================
+
+No necesitan el Mock API Server en ejecución.
+
+Para ejecutar: pytest test_registro_perezoso.py -v
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from utilidades import perfil_arranque
+from utilidades.asgi_local import llamar_asgi
+
+
+# Intérprete nuevo: en este proceso los otros tests ya importaron los endpoints
+CODIGO_SOLO_USUARIOS = """
+import asyncio, json, sys
+from mock_api_server_fastapi import crear_app
+from utilidades.asgi_local import llamar_asgi
+
+app = crear_app()
+antes = sorted(m for m in sys.modules if m.startswith("endpoints."))
+status, _, _ = asyncio.run(llamar_asgi(app, "GET", "/users/1"))
+despues = sorted(m for m in sys.modules if m.startswith("endpoints."))
+print(json.dumps({"status": status, "antes": antes, "despues": despues}))
+"""
+
+
+def test_solo_se_importa_el_router_de_la_peticion():
+    entorno = {**os.environ, "MOCK_API_ROUTERS_PEREZOSOS": "1"}
+    salida = subprocess.run(
+        [sys.executable, "-c", CODIGO_SOLO_USUARIOS], env=entorno, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    ).stdout
+
+    resultado = json.loads(salida.splitlines()[-1])
+    assert resultado["status"] == 200
+    assert resultado["antes"] == []
+    assert resultado["despues"] == ["endpoints.usuarios_endpoint"]
+
+
+@pytest.fixture
+def app_perezosa(usuarios_aislados, monkeypatch):
+    from mock_api_server_fastapi import crear_app
+
+    monkeypatch.setenv("MOCK_API_ROUTERS_PEREZOSOS", "1")
+    return crear_app()
+
+
+def test_health_lista_todas_las_rutas(app_perezosa):
+    routers = {"users", "autenticacion", "testing", "sistema", "batch"}
+
+    def prefijos():
+        return routers & {ruta.path.split("/")[1] for ruta in app_perezosa.routes}
+
+    asyncio.run(llamar_asgi(app_perezosa, "GET", "/users/1"))
+    assert prefijos() == {"users"}
+
+    status, _, cuerpo = asyncio.run(llamar_asgi(app_perezosa, "GET", "/sistema/health"))
+
+    assert status == 200
+    rutas = {linea.split(" - ")[0] for linea in json.loads(cuerpo)["endpoints"]}
+    assert {"GET /users/{user_id}", "POST /autenticacion/login", "GET /sistema/health", "POST /batch"} <= rutas
+    assert prefijos() == routers
+
+
+def test_desglose_importaciones(monkeypatch):
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       677 |        956 |     json.scanner\n"
+        "import time:       714 |       1670 |   json.decoder\n"
+        "import time:       402 |       2651 | json\n"
+        "otra salida del proceso\n"
+    )
+    monkeypatch.setattr(perfil_arranque, "_ejecutar",
+                        lambda argumentos, entorno: subprocess.CompletedProcess(argumentos, 0, "", stderr))
+
+    assert perfil_arranque.desglose_importaciones({}) == [
+        perfil_arranque.TiempoImportacion(677, 956, 2, "json.scanner"),
+        perfil_arranque.TiempoImportacion(714, 1670, 1, "json.decoder"),
+        perfil_arranque.TiempoImportacion(402, 2651, 0, "json"),
+    ]
@@ -0,0 +1,191 @@
+"""
+Tests unitarios de los repositorios de usuarios
+===============================================
+
+Verifican que el almacén SQLite (compartido entre workers) se comporte igual
+que la lista en memoria. No necesitan el Mock API Server en ejecución.
+
+Para ejecutar: pytest test_usuarios_repositorio.py -v
+"""
+
+import os
+
+import pytest
+
+from almacenamiento.usuarios_repositorio import (
+    RepositorioUsuariosMemoria,
+    RepositorioUsuariosParticionado,
+    RepositorioUsuariosSQLite,
+    VersionNoCoincide,
+    crear_repositorio,
+)
+
+
+@pytest.fixture(params=["memoria", "sqlite", "particionado"])
+def repositorio(request, tmp_path):
+    if request.param == "memoria":
+        return RepositorioUsuariosMemoria()
+    if request.param == "particionado":
+        return RepositorioUsuariosParticionado(str(tmp_path / "usuarios.db"), particiones=2)
+    return RepositorioUsuariosSQLite(str(tmp_path / "usuarios.db"))
+
+
+class TestRepositorioUsuarios:
+
+    def test_datos_iniciales(self, repositorio):
+        assert repositorio.total() == 3
+        assert repositorio.obtener(1)["name"] == "Juan Pérez"
+        assert repositorio.obtener(99) is None
+
+    def test_crear_asigna_total_mas_uno(self, repositorio):
+        nuevo = repositorio.crear("Ana", "ana@example.com")
+
+        assert nuevo == {"id": 4, "name": "Ana", "email": "ana@example.com"}
+        assert repositorio.listar(3, 4) == [nuevo]
+
+    def test_actualizar_parcial(self, repositorio):
+        actualizado, version = repositorio.actualizar(1, {"name": "Juana"})
+
+        assert actualizado == {"id": 1, "name": "Juana", "email": "juan@example.com"}
+        assert version == 1
+        assert repositorio.obtener(1)["name"] == "Juana"
+        assert repositorio.actualizar(99, {"name": "X"}) == (None, 0)
+
+    def test_eliminar(self, repositorio):
+        assert repositorio.eliminar(2) is True
+        assert repositorio.eliminar(2) is False
+        assert [u["id"] for u in repositorio.listar(0, 10)] == [1, 3]
+
+    def test_versiones(self, repositorio):
+        assert repositorio.version_coleccion() == 0
+        repositorio.crear("Ana", "ana@example.com")
+        repositorio.actualizar(1, {"name": "Juana"})
+        repositorio.eliminar(1)
+
+        assert repositorio.version_coleccion() == 3
+        assert repositorio.version_usuario(4) == 1
+        # La versión sobrevive al borrado para que un ID reutilizado no repita ETags
+        assert repositorio.version_usuario(1) == 2
+        assert repositorio.obtener_con_version(4) == ({"id": 4, "name": "Ana", "email": "ana@example.com"}, 1)
+        assert repositorio.pagina(0, 1) == ([{"id": 2, "name": "María García", "email": "maria@example.com"}], 3, 3)
+
+    def test_escritura_condicionada_a_version(self, repositorio):
+        with pytest.raises(VersionNoCoincide):
+            repositorio.actualizar(1, {"name": "Juana"}, versiones={5})
+        assert repositorio.actualizar(1, {"name": "Juana"}, versiones={0})[1] == 1
+
+        with pytest.raises(VersionNoCoincide):
+            repositorio.eliminar(1, versiones={0})
+        assert repositorio.eliminar(1, versiones={1}) is True
+
+    @pytest.mark.parametrize("inicio,fin", [(0, 2), (2, 10), (-10, 0), (0, -1), (5, 3)])
+    def test_listar_respeta_slicing(self, repositorio, inicio, fin):
+        esperado = RepositorioUsuariosMemoria().listar(inicio, fin)
+
+        assert repositorio.listar(inicio, fin) == esperado
+
+
+def test_sqlite_compartido_entre_conexiones(tmp_path):
+    ruta = str(tmp_path / "usuarios.db")
+    worker_a = RepositorioUsuariosSQLite(ruta)
+    worker_b = RepositorioUsuariosSQLite(ruta)
+
+    worker_a.crear("Ana", "ana@example.com")
+
+    # El segundo worker no vuelve a cargar los datos de ejemplo y ve la escritura
+    assert worker_b.total() == 4
+    assert worker_b.obtener(4)["name"] == "Ana"
+
+
+def test_particionado_compartido_entre_workers(tmp_path):
+    ruta = str(tmp_path / "usuarios.db")
+    worker_a = RepositorioUsuariosParticionado(ruta, particiones=3)
+    worker_b = RepositorioUsuariosParticionado(ruta, particiones=3)
+
+    creados = [worker_a.crear(f"Usuario {i}", f"u{i}@example.com") for i in range(4)]
+    worker_b.eliminar(creados[0]["id"])
+    nuevo = worker_b.crear("Ana", "ana@example.com")
+
+    # Los IDs vienen de un contador compartido y no se reutilizan
+    assert [u["id"] for u in creados] == [4, 5, 6, 7]
+    assert nuevo["id"] == 8
+    assert worker_a.obtener(8) == nuevo
+    assert [u["id"] for u in worker_a.listar(2, 6)] == [3, 5, 6, 7]
+    assert worker_a.pagina(0, 0)[1:] == (7, 6)
+    assert {particion.total() for particion in worker_a.particiones} == {2, 3}
+
+
+def test_particionado_rechaza_otra_cantidad_de_particiones(tmp_path):
+    RepositorioUsuariosParticionado(str(tmp_path / "usuarios.db"), particiones=2)
+
+    with pytest.raises(ValueError):
+        RepositorioUsuariosParticionado(str(tmp_path / "usuarios.db"), particiones=4)
+
+
+def test_crear_repositorio_desde_url(tmp_path):
+    assert isinstance(crear_repositorio("memoria"), RepositorioUsuariosMemoria)
+    assert isinstance(crear_repositorio(f"sqlite:///{tmp_path / 'u.db'}"), RepositorioUsuariosSQLite)
+    assert isinstance(crear_repositorio(f"sqlite:///{tmp_path / 'p.db'}?particiones=4"), RepositorioUsuariosParticionado)
+
+    with pytest.raises(ValueError):
+        crear_repositorio("redis://localhost")
+
+
+@pytest.mark.parametrize("perfil", ["desarrollo", "produccion"])
+def test_almacen_se_exporta_en_ambos_perfiles(monkeypatch, tmp_path, perfil):
+    from mock_api_server_fastapi import configuracion_uvicorn, parsear_argumentos
+
+    # setenv registra el valor original para restaurarlo al terminar
+    monkeypatch.setenv("MOCK_API_ALMACEN", "memoria")
+    ruta = f"sqlite:///{tmp_path / 'u.db'}"
+    args = parsear_argumentos(["--perfil", perfil, "--workers", "1", "--almacen", ruta, "--particiones", "3"])
+
+    configuracion_uvicorn(args)
+
+    assert os.environ["MOCK_API_ALMACEN"] == f"{ruta}?particiones=3"
+
+
+def test_directorio_temporal_de_varios_workers_se_borra_al_salir(monkeypatch):
+    import atexit
+    import shutil
+
+    from mock_api_server_fastapi import configuracion_uvicorn, parsear_argumentos
+
+    registrados = []
+    monkeypatch.setattr(atexit, "register", lambda funcion, *args, **kwargs: registrados.append((funcion, args)))
+    # setenv registra el valor original para restaurarlo al terminar
+    for variable in ("MOCK_API_ALMACEN", "MOCK_API_DIR_METRICAS"):
+        monkeypatch.setenv(variable, "")
+        monkeypatch.delenv(variable)
+    args = parsear_argumentos(["--perfil", "produccion", "--workers", "2"])
+
+    configuracion_uvicorn(args)
+
+    temporal = os.path.dirname(os.environ["MOCK_API_ALMACEN"][len("sqlite:///"):])
+    assert registrados == [(shutil.rmtree, (temporal,))]
+    assert os.environ["MOCK_API_DIR_METRICAS"].startswith(temporal)
+    shutil.rmtree(temporal)
+
+
+def test_endpoints_llaman_a_sqlite_fuera_del_event_loop(app, monkeypatch, repositorio):
+    import asyncio
+    import threading
+
+    from endpoints.usuarios_endpoint import UsuariosEndPoint
+    from utilidades.asgi_local import llamar_asgi
+
+    hilos = set()
+    pagina_original = type(repositorio).pagina
+
+    def pagina(self, inicio, fin):
+        hilos.add(threading.get_ident())
+        return pagina_original(self, inicio, fin)
+
+    monkeypatch.setattr(type(repositorio), "pagina", pagina)
+    monkeypatch.setattr(UsuariosEndPoint, "repositorio", repositorio)
+
+    status, _, _ = asyncio.run(llamar_asgi(app, "GET", "/users/"))
+
+    assert status == 200
+    en_el_loop = hilos == {threading.get_ident()}
+    assert en_el_loop is not repositorio.BLOQUEANTE
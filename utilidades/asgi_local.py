@@ -0,0 +1,68 @@
+"""
+Invocación en proceso de una aplicación ASGI
+============================================
+
+Permite ejecutar una petición HTTP contra la app sin sockets ni cliente
+HTTP, útil para benchmarks que solo quieren medir el costo del servidor.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+async def llamar_asgi(app, metodo: str, url: str, headers: Optional[Dict[str, str]] = None,
+                      body: bytes = b"", scope_extra: Optional[Dict[str, Any]] = None,
+                      ) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    """
+    Ejecuta ``metodo url`` sobre ``app`` y retorna (status, headers, body).
+
+    ``url`` es el path con query string opcional, p. ej. ``/users/?page=2``.
+    ``scope_extra`` agrega claves al scope ASGI (p. ej. ``{"batch": True}``).
+    """
+    partes = urlsplit(url)
+    cabeceras = [(nombre.lower().encode("latin-1"), valor.encode("latin-1"))
+                 for nombre, valor in (headers or {}).items()]
+    if body and not any(nombre == b"content-length" for nombre, _ in cabeceras):
+        cabeceras.append((b"content-length", str(len(body)).encode("ascii")))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": metodo.upper(),
+        "scheme": "http",
+        "path": partes.path,
+        "raw_path": partes.path.encode("utf-8"),
+        "query_string": partes.query.encode("latin-1"),
+        "root_path": "",
+        "headers": cabeceras,
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 80),
+        **(scope_extra or {}),
+    }
+
+    pendiente = [{"type": "http.request", "body": body, "more_body": False}]
+    respuesta = {"status": 500, "headers": [], "body": []}
+
+    async def receive():
+        if pendiente:
+            return pendiente.pop()
+        return {"type": "http.disconnect"}
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            respuesta["status"] = mensaje["status"]
+            respuesta["headers"] = list(mensaje.get("headers", []))
+        elif mensaje["type"] == "http.response.body":
+            respuesta["body"].append(mensaje.get("body", b""))
+
+    await app(scope, receive, send)
+    return respuesta["status"], respuesta["headers"], b"".join(respuesta["body"])
+
+
+def pedir(app, metodo: str, url: str, headers: Optional[Dict[str, str]] = None,
+          body: bytes = b"") -> Tuple[int, Dict[str, str], bytes]:
+    """Versión síncrona de ``llamar_asgi`` para tests: headers como diccionario"""
+    status, cabeceras, cuerpo = asyncio.run(llamar_asgi(app, metodo, url, headers=headers, body=body))
+    return status, {nombre.decode(): valor.decode() for nombre, valor in cabeceras}, cuerpo
@@ -0,0 +1,72 @@
+"""
+Peticiones condicionales (ETag, If-None-Match, If-Match)
+========================================================
+
+Los ETags se derivan de los contadores de versión del repositorio de
+usuarios, así que calcularlos no requiere serializar ni hashear el cuerpo.
+"""
+
+import re
+from typing import List, Optional, Set
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+
+# Forma de los ETags de usuario: "<epoca>-u<id>-v<version>"
+_ETAG_USUARIO = re.compile(r'^"(?P<epoca>[0-9a-f]+)-u(?P<id>-?\d+)-v(?P<version>\d+)"$')
+
+
+def etag_usuario(epoca: str, user_id: int, version: int) -> str:
+    return f'"{epoca}-u{user_id}-v{version}"'
+
+
+def etag_pagina(epoca: str, version_coleccion: int, page: int, limit: int) -> str:
+    return f'"{epoca}-c{version_coleccion}-p{page}-l{limit}"'
+
+
+def _etags(cabecera: str) -> List[str]:
+    return [etag.strip() for etag in cabecera.split(",") if etag.strip()]
+
+
+def coincide_if_none_match(cabecera: Optional[str], etag: str) -> bool:
+    """Comparación débil (RFC 9110 §13.1.2): se ignora el prefijo W/"""
+    if not cabecera:
+        return False
+    etags = _etags(cabecera)
+    return "*" in etags or etag in (e[2:] if e.startswith("W/") else e for e in etags)
+
+
+def versiones_if_match(cabecera: Optional[str], epoca: str, user_id: int) -> Optional[Set[int]]:
+    """
+    Versiones del usuario aceptadas por un If-Match (comparación fuerte).
+
+    Retorna None si no hay cabecera o es ``*`` (cualquier versión sirve) y
+    un conjunto, posiblemente vacío, con las versiones de los ETags que
+    corresponden a este usuario y a esta época del almacén.
+    """
+    if cabecera is None:
+        return None
+    etags = _etags(cabecera)
+    if "*" in etags:
+        return None
+    versiones = set()
+    for etag in etags:
+        coincidencia = _ETAG_USUARIO.match(etag)
+        if coincidencia and coincidencia["epoca"] == epoca and int(coincidencia["id"]) == user_id:
+            versiones.add(int(coincidencia["version"]))
+    return versiones
+
+
+def no_modificado(etag: str) -> Response:
+    """Respuesta 304 sin cuerpo"""
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def precondicion_fallida(etag: str) -> HTTPException:
+    """Error 412 para un If-Match que no coincide con la versión actual"""
+    return HTTPException(
+        status_code=412,
+        detail="Precondition failed: the resource was modified",
+        headers={"ETag": etag}
+    )
@@ -0,0 +1,10 @@
+"""
+Lectura de opciones desde variables de entorno
+"""
+
+import os
+
+
+def variable_activada(nombre: str) -> bool:
+    """True si la variable de entorno ``nombre`` tiene un valor afirmativo (1, true, si...)"""
+    return os.environ.get(nombre, "").strip().lower() in ("1", "true", "si", "sí", "yes", "on")
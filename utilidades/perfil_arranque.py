@@ -0,0 +1,103 @@
+"""
+Perfil de arranque del servidor
+===============================
+
+Mide cuánto tarda un intérprete nuevo en importar el servidor y construir la
+aplicación, y muestra el desglose de ``python -X importtime`` para encontrar
+qué módulos se llevan el tiempo. Se usa desde:
+
+    python mock_api_server_fastapi.py --import-profile [--presupuesto-ms 800]
+
+El proceso termina con código 1 si el arranque supera el presupuesto, para
+poder usarlo como chequeo en CI.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+# Código que ejecuta el intérprete medido: importar el módulo y construir la app
+CODIGO_ARRANQUE = "import mock_api_server_fastapi as servidor; servidor.crear_app()"
+
+
+class TiempoImportacion(NamedTuple):
+    propio_us: int
+    acumulado_us: int
+    nivel: int
+    modulo: str
+
+
+def _ejecutar(argumentos: List[str], entorno: Dict[str, str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *argumentos],
+        env=entorno,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+
+def medir_arranque(entorno: Dict[str, str], repeticiones: int = 5) -> float:
+    """Mediana (ms) del tiempo de pared de un arranque en frío"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        _ejecutar(["-c", CODIGO_ARRANQUE], entorno)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def desglose_importaciones(entorno: Dict[str, str]) -> List[TiempoImportacion]:
+    """Tiempos de ``-X importtime`` (se escriben en stderr del proceso hijo)"""
+    salida = _ejecutar(["-X", "importtime", "-c", CODIGO_ARRANQUE], entorno).stderr
+    tiempos = []
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|", 2)
+        tiempos.append(TiempoImportacion(
+            int(propio),
+            int(acumulado),
+            (len(nombre) - len(nombre.lstrip()) - 1) // 2,
+            nombre.strip()
+        ))
+    return tiempos
+
+
+def perfilar_arranque(presupuesto_ms: Optional[float] = None, top: int = 15,
+                      routers_perezosos: bool = False) -> int:
+    """Imprime el perfil de arranque y retorna el código de salida (0 = dentro del presupuesto)"""
+    entorno = dict(os.environ)
+    if routers_perezosos:
+        entorno["MOCK_API_ROUTERS_PEREZOSOS"] = "1"
+
+    tiempos = desglose_importaciones(entorno)
+    arranque_ms = medir_arranque(entorno)
+
+    print(f"⏱️  Perfil de arranque ({'routers perezosos' if routers_perezosos else 'routers al arrancar'})")
+    print("-" * 60)
+    print(f"{'acumulado (ms)':>15}{'propio (ms)':>13}  módulo de primer nivel")
+    for tiempo in sorted((t for t in tiempos if t.nivel == 0), key=lambda t: -t.acumulado_us)[:top]:
+        print(f"{tiempo.acumulado_us / 1000:>15.1f}{tiempo.propio_us / 1000:>13.1f}  {tiempo.modulo}")
+
+    print()
+    print(f"{'propio (ms)':>15}  módulos más costosos por sí mismos")
+    for tiempo in sorted(tiempos, key=lambda t: -t.propio_us)[:top]:
+        print(f"{tiempo.propio_us / 1000:>15.1f}  {tiempo.modulo}")
+
+    print()
+    total_importaciones = sum(t.acumulado_us for t in tiempos if t.nivel == 0) / 1000
+    print(f"📦 Importaciones: {total_importaciones:.1f} ms (con la sobrecarga de -X importtime)")
+    print(f"🚀 Arranque en frío (mediana de 5, intérprete + app): {arranque_ms:.1f} ms")
+
+    if presupuesto_ms is None:
+        return 0
+    if arranque_ms > presupuesto_ms:
+        print(f"❌ Supera el presupuesto de {presupuesto_ms:.0f} ms")
+        return 1
+    print(f"✅ Dentro del presupuesto de {presupuesto_ms:.0f} ms")
+    return 0
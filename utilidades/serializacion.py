@@ -0,0 +1,76 @@
+"""
+Serialización JSON rápida (opcional)
+====================================
+
+Por defecto FastAPI valida el valor retornado por cada endpoint contra su
+``response_model``, lo convierte con ``jsonable_encoder`` y lo codifica con
+el módulo ``json`` de la librería estándar.
+
+Con el modo rápido activo (MOCK_API_JSON_RAPIDO=1):
+- La clase de respuesta por defecto de la app pasa a ser ``ORJSONResponse``
+  cuando ``orjson`` está instalado (``pip install orjson``).
+- Los endpoints calientes retornan directamente una respuesta ya codificada
+  con ``respuesta_json()``, saltándose la validación redundante contra
+  ``response_model=Dict[str, Any]``.
+
+Sin ``orjson`` el modo rápido sigue omitiendo la validación, pero codifica
+con ``json`` de la librería estándar.
+"""
+
+import json
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+
+from utilidades.entorno import variable_activada
+
+try:
+    import orjson
+except ImportError:  # Dependencia opcional
+    orjson = None
+
+
+# Estado del modo rápido (ver configurar)
+JSON_RAPIDO = variable_activada("MOCK_API_JSON_RAPIDO")
+
+
+def configurar(rapido: bool):
+    """Activa o desactiva el modo rápido en tiempo de ejecución"""
+    global JSON_RAPIDO
+    JSON_RAPIDO = rapido
+
+
+def clase_respuesta_por_defecto() -> type:
+    """Clase de respuesta que debe usar la app según el modo configurado"""
+    if JSON_RAPIDO and orjson is not None:
+        return ORJSONResponse
+    return JSONResponse
+
+
+def codificar(contenido: Any) -> bytes:
+    """Codifica a JSON con el mismo formato compacto que JSONResponse"""
+    if orjson is not None:
+        return orjson.dumps(contenido)
+    return json.dumps(contenido, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def respuesta_json(contenido: Any, response: Optional[Response] = None):
+    """
+    Respuesta para endpoints calientes.
+
+    En modo rápido retorna un ``Response`` ya codificado, que FastAPI envía
+    sin validar ni convertir. Fuera del modo rápido retorna ``contenido``
+    tal cual para que siga el camino normal de FastAPI.
+
+    ``response`` es el parámetro ``Response`` que FastAPI inyecta al
+    endpoint: sus cabeceras (ETag, etc.) se copian a la respuesta rápida,
+    ya que FastAPI solo las aplica cuando el endpoint retorna un valor.
+    """
+    if not JSON_RAPIDO:
+        return contenido
+    respuesta = Response(content=codificar(contenido), media_type="application/json")
+    if response is not None:
+        for nombre, valor in response.headers.items():
+            if nombre != "content-length":
+                respuesta.headers[nombre] = valor
+    return respuesta